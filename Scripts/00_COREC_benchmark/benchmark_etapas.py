@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark_etapas
+
+Benchmark reproducible de las etapas 04, 05, 07, 08-I y 08-II sobre un corpus sintético.
+
+- Genera una raíz COREC falsa con generar_corpus_sintetico (misma semilla = mismo corpus).
+- Ejecuta cada etapa tal cual, como proceso aparte y con esa raíz como carpeta de
+  trabajo (las rutas relativas de CONFIG apuntan al corpus sintético). Cada etapa lee
+  la salida de la anterior, como en el pipeline real.
+- Mide el tiempo total, archivos/s, UDs/s (1 UD = 1 línea con etiqueta de turno en la
+  entrada de la etapa) y la memoria máxima (RSS) del proceso.
+
+Las etapas cuyas dependencias no están instaladas (spaCy y es_core_news_lg en la 07;
+Hunspell y su diccionario de español en la 08) se omiten. Si se omite la 07, la 08-I
+se mide sobre la salida de la 04 copiada como *_seg.txt (un turno por línea), para que
+08-I y 08-II puedan medirse igualmente.
+
+Uso:
+    python benchmark_etapas.py --archivos 10,100,1000 [--etapas 04,05,08-I] [--csv tiempos.csv]
+"""
+
+import os
+import re
+import sys
+import csv
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+
+from generar_corpus_sintetico import generar_corpus
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.dirname(CARPETA)
+
+REN = "Corpus/TXT/Ren"
+LIMPIO = "Corpus/TXT/Ren_limpio_fase_0"
+SEG = "Preprocesamiento_linguistico/1_Textos_segmentacion_discursiva"
+NORMAS_1 = "Preprocesamiento_linguistico/2_Salida_TXT_normas/Salida_TXT_normas_1"
+NORMAS_2 = "Preprocesamiento_linguistico/2_Salida_TXT_normas/Salida_TXT_normas_2"
+LOGS = "Preprocesamiento_linguistico/3_Logs"
+
+# etapa -> (script, carpeta de entrada, salidas que se borran antes de medir, dependencias)
+ETAPAS = {
+    "04": ("04_COREC_limpieza_basica_fase_0/04_corec_limpieza_basica_fase_0.py",
+           REN, [LIMPIO], []),
+    "05": ("05_COREC_analisis_frecuencias/05_COREC_analisis_frecuencias.py",
+           LIMPIO, ["Frecuencias_basicas"], []),
+    "07": ("07_COREC_segmentacion_discursiva/07_COREC_segmentacion_discursiva.py",
+           LIMPIO, [SEG], ["spacy", "es_core_news_lg"]),
+    "08-I": ("08_COREC_normas_preprocesamiento/08_COREC_normas_preprocesamiento_I.py",
+             SEG, [NORMAS_1, LOGS + "/Log_normas_1"], ["hunspell", "diccionario hunspell es"]),
+    "08-II": ("08_COREC_normas_preprocesamiento/08_COREC_normas_preprocesamiento_II.py",
+              NORMAS_1, [NORMAS_2, LOGS + "/Log_normas_2"], ["hunspell", "diccionario hunspell es"]),
+}
+
+# mismos diccionarios que buscan las etapas 08-I y 08-II
+DICCIONARIOS_HUNSPELL = [
+    "/usr/share/hunspell/es_ES.dic",
+    "/usr/share/hunspell/es_ANY.dic",
+    "/usr/share/myspell/es_ES.dic",
+]
+
+# carpetas que las etapas esperan encontrar creadas
+CARPETAS_PREVIAS = {"05": ["Frecuencias_basicas"]}
+
+TAG_LABEL = r"(?:INF|ENT|E|I)\d*"
+UD = re.compile(rf"^\s*{TAG_LABEL}(?:/{TAG_LABEL})*\s*[:=]")
+
+
+def contar_entrada(carpeta):
+    """(nº de TXT, nº de UDs) bajo carpeta."""
+    archivos = uds = 0
+    for dp, _, nombres in os.walk(carpeta):
+        for nombre in nombres:
+            if not nombre.lower().endswith(".txt"):
+                continue
+            archivos += 1
+            with open(os.path.join(dp, nombre), encoding="utf-8", errors="ignore") as f:
+                uds += sum(1 for ln in f if UD.match(ln))
+    return archivos, uds
+
+
+def faltan_dependencias(dependencias):
+    faltan = []
+    for d in dependencias:
+        if d == "diccionario hunspell es":
+            if not any(os.path.exists(p) and os.path.exists(p[:-4] + ".aff") for p in DICCIONARIOS_HUNSPELL):
+                faltan.append(d)
+        elif importlib.util.find_spec(d) is None:
+            faltan.append(d)
+    return faltan
+
+
+def segmentacion_sustituta(raiz):
+    """Sin la etapa 07: copia la salida de la 04 (un turno por línea) como entrada de la 08-I."""
+    origen = os.path.join(raiz, LIMPIO)
+    for dp, _, nombres in os.walk(origen):
+        destino = os.path.join(raiz, SEG, os.path.relpath(dp, origen))
+        os.makedirs(destino, exist_ok=True)
+        for nombre in nombres:
+            if nombre.lower().endswith(".txt"):
+                shutil.copyfile(os.path.join(dp, nombre),
+                                os.path.join(destino, nombre[:-4] + "_seg.txt"))
+
+
+def ejecutar(script, raiz, log):
+    """Ejecuta un script con cwd=raiz; devuelve (código de salida, segundos, RSS máx. en MB o None)."""
+    env = dict(os.environ,
+               PYTHONIOENCODING="utf-8",
+               COREC_INDICE_DB=os.path.join(raiz, "_indice_benchmark.sqlite"),
+               COREC_TOKENIZADO_DIR=os.path.join(raiz, "_tokenizado_benchmark"))
+    with open(log, "w", encoding="utf-8") as salida:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, script], cwd=raiz, env=env,
+                                stdout=salida, stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):
+            # wait4 devuelve el uso de recursos del hijo (ru_maxrss: KB en Linux, bytes en macOS)
+            _, estado, uso = os.wait4(proc.pid, 0)
+            segundos = time.perf_counter() - t0
+            codigo = os.waitstatus_to_exitcode(estado)
+            rss = uso.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        else:
+            codigo = proc.wait()
+            segundos = time.perf_counter() - t0
+            rss = None
+    return codigo, segundos, rss
+
+
+def medir_etapa(etapa, raiz, repeticiones):
+    script, entrada, salidas, dependencias = ETAPAS[etapa]
+    fila = {"etapa": etapa, "estado": "OK", "archivos": 0, "uds": 0, "segundos": None,
+            "archivos_por_seg": None, "uds_por_seg": None, "rss_max_mb": None, "nota": ""}
+
+    faltan = faltan_dependencias(dependencias)
+    if faltan:
+        fila.update(estado="OMITIDA", nota="falta " + ", ".join(faltan))
+        return fila
+    if etapa == "08-I" and not os.path.isdir(os.path.join(raiz, SEG)):
+        segmentacion_sustituta(raiz)
+        fila["nota"] = "entrada: salida de la 04 (sin 07)"
+    if not os.path.isdir(os.path.join(raiz, entrada)):
+        fila.update(estado="OMITIDA", nota=f"no existe {entrada}")
+        return fila
+
+    fila["archivos"], fila["uds"] = contar_entrada(os.path.join(raiz, entrada))
+    if not fila["archivos"]:
+        fila.update(estado="OMITIDA", nota=f"no hay TXT en {entrada}")
+        return fila
+    log = os.path.join(raiz, "_logs", f"{etapa}.log")
+    mejores = []
+    for _ in range(repeticiones):
+        for s in salidas:
+            shutil.rmtree(os.path.join(raiz, s), ignore_errors=True)
+        for c in CARPETAS_PREVIAS.get(etapa, []):
+            os.makedirs(os.path.join(raiz, c), exist_ok=True)
+
+        codigo, segundos, rss = ejecutar(os.path.join(SCRIPTS, script), raiz, log)
+        if codigo != 0:
+            fila.update(estado="ERROR", nota=f"código {codigo}; ver {log}")
+            return fila
+        mejores.append((segundos, rss))
+
+    segundos = min(s for s, _ in mejores)
+    rss = [r for _, r in mejores if r is not None]
+    fila.update(
+        segundos=segundos,
+        archivos_por_seg=fila["archivos"] / segundos,
+        uds_por_seg=fila["uds"] / segundos,
+        rss_max_mb=max(rss) if rss else None,
+    )
+    return fila
+
+
+def _fmt(valor, formato):
+    return "-" if valor is None else format(valor, formato)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de las etapas 04-08 sobre un corpus sintético.")
+    ap.add_argument("--archivos", default="100", help="tamaños de corpus a medir (ej. 10,100,1000)")
+    ap.add_argument("--turnos", type=int, default=60, help="turnos medios por entrevista")
+    ap.add_argument("--etapas", default=",".join(ETAPAS), help="etapas a medir (ej. 04,05,08-I)")
+    ap.add_argument("--repeticiones", type=int, default=1, help="se toma el mejor tiempo")
+    ap.add_argument("--semilla", type=int, default=1234)
+    ap.add_argument("--csv", default=None, help="guardar los resultados en un CSV (separador ;)")
+    ap.add_argument("--dir", default=None, help="carpeta de trabajo (por defecto, temporal)")
+    args = ap.parse_args()
+
+    etapas = [e.strip() for e in args.etapas.split(",") if e.strip()]
+    desconocidas = [e for e in etapas if e not in ETAPAS]
+    if desconocidas:
+        ap.error(f"etapas desconocidas: {', '.join(desconocidas)} (disponibles: {', '.join(ETAPAS)})")
+
+    trabajo = args.dir or tempfile.mkdtemp(prefix="corec_bench_etapas_")
+    filas = []
+    for n in [int(x) for x in args.archivos.split(",") if x.strip()]:
+        raiz = os.path.join(trabajo, f"corpus_{n}")
+        shutil.rmtree(raiz, ignore_errors=True)
+        os.makedirs(os.path.join(raiz, "_logs"))
+        rutas = generar_corpus(raiz, n, args.turnos, args.semilla)
+        mb = sum(os.path.getsize(r) for r in rutas) / 1e6
+        print(f"\nCorpus sintético: {n} entrevistas ({mb:.1f} MB) en {raiz}")
+
+        for etapa in etapas:
+            fila = medir_etapa(etapa, raiz, args.repeticiones)
+            fila["corpus"] = n
+            filas.append(fila)
+            print(f"  {etapa:<6} {fila['estado']:<8} {_fmt(fila['segundos'], '.2f'):>7} s  {fila['nota']}")
+
+    print(f"\n{'corpus':>7} {'etapa':<6} {'estado':<8} {'TXT':>6} {'UDs':>8} {'seg':>8} "
+          f"{'TXT/s':>8} {'UDs/s':>9} {'RSS MB':>7}")
+    for r in filas:
+        print(
+            f"{r['corpus']:>7} {r['etapa']:<6} {r['estado']:<8} {r['archivos']:>6} {r['uds']:>8} "
+            f"{_fmt(r['segundos'], '.2f'):>8} {_fmt(r['archivos_por_seg'], '.1f'):>8} "
+            f"{_fmt(r['uds_por_seg'], '.0f'):>9} {_fmt(r['rss_max_mb'], '.1f'):>7}"
+        )
+
+    if args.csv:
+        campos = ["corpus", "etapa", "estado", "archivos", "uds", "segundos",
+                  "archivos_por_seg", "uds_por_seg", "rss_max_mb", "nota"]
+        with open(args.csv, "w", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=campos, delimiter=";")
+            w.writeheader()
+            w.writerows(filas)
+        print("\nResultados:", args.csv)
+
+    if not args.dir:
+        shutil.rmtree(trabajo, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
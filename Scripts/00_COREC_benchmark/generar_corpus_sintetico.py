@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+generar_corpus_sintetico
+
+Genera entrevistas sintéticas con el formato de los TXT renombrados del COREC
+(entrada de la etapa 04), dentro de una raíz COREC falsa:
+
+    <raiz>/Corpus/TXT/Ren/<lengua>/<enclave>/<lengua>_<pais>_<nnnn>.txt
+
+Cada entrevista incluye:
+- turnos E / I / INF / ENT (con número, combinados "E1/E2", en minúscula, con ":",
+  "=" o solo espacio, y etiquetas aisladas en su propia línea),
+- barras prosódicas "/" y "//" (pegadas o separadas),
+- bloques [ ], ( ), < > y { } (ruido "(ININT)", aclaraciones, solapamientos),
+- truncamientos ("cho-", "bue-no"), alargamientos con ":" ("pe:ro", "sí::"),
+- risas "jajaja" sin corchetes,
+- líneas residuales (números de página, "COREC", líneas vacías) y saltos CRLF.
+
+Los archivos de asturiano llevan el prefijo 014_ (la etapa 08-II activa el
+diccionario asturiano con ese prefijo). Misma semilla = mismo corpus.
+
+Uso:
+    python generar_corpus_sintetico.py <raiz> --archivos 500 [--turnos 60] [--semilla 1234]
+"""
+
+import os
+import sys
+import random
+import argparse
+
+# (código de lengua, carpeta de lengua, país, enclaves)
+LENGUAS = [
+    ("001", "01_Catalan", "01", ["Barcelona", "Lleida"]),
+    ("005", "05_Euskera", "01", ["Bilbao", "Donostia"]),
+    ("009", "09_Quechua", "07", ["Cusco", "Ayacucho"]),
+    ("011", "11_Gallego", "01", ["Vigo", "Lugo"]),
+    ("014", "14_Asturiano", "01", ["Gijon", "Oviedo Centro"]),
+]
+
+PALABRAS = (
+    "pues entonces nosotros íbamos al pueblo con mi abuela y allí se hablaba la lengua "
+    "de casa pero en la escuela nos decían que teníamos que hablar en castellano porque "
+    "si no los maestros se enfadaban y bueno así fue cuando yo era pequeña mi padre "
+    "trabajaba en el campo y mi madre cosía por las noches ahora ya casi nadie lo habla "
+    "los jóvenes lo entienden pero no lo usan eso sí en las fiestas todavía se canta"
+).split()
+
+# Vocabulario asturiano para los archivos 014_ (formas que la etapa 08-II trata aparte)
+PALABRAS_AST = (
+    "yo falo asturianu en casa col mio güelu y la mio güela nun sabíen castellanu "
+    "cuando yera neñu díbemos a la escuela y ende falábemos castellanu too el día "
+    "agora los rapazos nun lu falen muncho pero entienden tolo"
+).split()
+
+ETIQUETAS_ENT = ["E", "ENT", "E1", "E2", "E1/E2", "e"]
+ETIQUETAS_INF = ["I", "INF", "I1", "I2", "i", "INF2"]
+SEPARADORES = [": ", ": ", ": ", ":", " = ", " ", ":  "]
+
+MARCAS = [
+    "[risas]", "[ruido]", "[se refiere a la escuela]", "[corrección: abuelo]",
+    "(ININT)", "(INAUDIBLE)", "(silencio)", "(tose)",
+    "<simultáneo>", "<~pero>", "<ruido de fondo>",
+    "{ast}", "{cat}", "{en la lengua de casa}",
+]
+
+
+def _palabra(rnd, vocab):
+    w = rnd.choice(vocab)
+    x = rnd.random()
+    if x < 0.03:                               # truncamiento
+        return w[: max(1, len(w) // 2)] + "-"
+    if x < 0.05 and len(w) > 3:                # palabra partida por guion
+        k = len(w) // 2
+        return w[:k] + "-" + w[k:]
+    if x < 0.08 and len(w) > 2:                # alargamiento con ":"
+        k = rnd.randint(1, len(w) - 1)
+        return w[:k] + ":" + w[k:]
+    if x < 0.09:
+        return w + "::"
+    if x < 0.11:
+        return rnd.choice(["jajaja", "jajajaja", "jeje"])
+    return w
+
+
+def _contenido(rnd, vocab, n_palabras):
+    """Texto de una intervención: palabras, marcas entre corchetes, barras y puntuación."""
+    piezas = []
+    for i in range(n_palabras):
+        piezas.append(_palabra(rnd, vocab))
+        x = rnd.random()
+        if x < 0.10:
+            piezas.append(rnd.choice(["/", "/", "//"]))
+        elif x < 0.13:
+            piezas[-1] += rnd.choice(["/", "//"])        # barra pegada a la palabra
+        elif x < 0.17:
+            piezas.append(rnd.choice(MARCAS))
+        elif x < 0.20:
+            piezas[-1] += rnd.choice([".", ",", "?", "...", ";"])
+        elif x < 0.21:
+            piezas[-1] += "  "                           # espacios de más
+    if rnd.random() < 0.7:
+        piezas.append(rnd.choice(["/", "//"]))
+    return " ".join(piezas).replace("   ", "  ")
+
+
+def generar_entrevista(rnd, vocab, n_turnos):
+    """Líneas de una entrevista sintética (sin saltos de línea)."""
+    lineas = [f"Transcripción COREC {rnd.randint(1, 999):03d}", ""]
+    for t in range(n_turnos):
+        etiqueta = rnd.choice(ETIQUETAS_ENT if t % 2 == 0 else ETIQUETAS_INF)
+        largo = rnd.randint(3, 12) if t % 2 == 0 else rnd.randint(6, 60)
+        texto = _contenido(rnd, vocab, largo)
+
+        x = rnd.random()
+        if x < 0.06:                               # etiqueta sola en su línea
+            lineas += [etiqueta + ":", texto]
+        elif x < 0.14:                             # intervención partida en dos líneas
+            corte = texto.find(" ", len(texto) // 2)
+            corte = corte if corte > 0 else len(texto)
+            lineas += [etiqueta + rnd.choice(SEPARADORES) + texto[:corte], texto[corte:].strip()]
+        else:
+            lineas.append(etiqueta + rnd.choice(SEPARADORES) + texto)
+
+        x = rnd.random()
+        if x < 0.03:
+            lineas.append(str(rnd.randint(1, 40)))  # número de página
+        elif x < 0.05:
+            lineas.append("")
+        elif x < 0.06:
+            lineas.append("COREC")
+    return lineas
+
+
+def generar_corpus(raiz, n_archivos, turnos=60, semilla=1234):
+    """
+    Escribe n_archivos entrevistas en <raiz>/Corpus/TXT/Ren y devuelve la lista de rutas.
+    El número de turnos por entrevista varía entre turnos/2 y 3*turnos/2.
+    """
+    rnd = random.Random(semilla)
+    base = os.path.join(raiz, "Corpus", "TXT", "Ren")
+    rutas = []
+    for i in range(n_archivos):
+        cod, carpeta, pais, enclaves = LENGUAS[i % len(LENGUAS)]
+        destino = os.path.join(base, carpeta, rnd.choice(enclaves))
+        os.makedirs(destino, exist_ok=True)
+
+        vocab = PALABRAS_AST + PALABRAS[:20] if cod == "014" else PALABRAS
+        n_turnos = rnd.randint(max(2, turnos // 2), max(2, turnos * 3 // 2))
+        lineas = generar_entrevista(rnd, vocab, n_turnos)
+
+        nl = "\r\n" if rnd.random() < 0.2 else "\n"
+        ruta = os.path.join(destino, f"{cod}_{pais}_{i + 1:04d}.txt")
+        with open(ruta, "w", encoding="utf-8", newline="") as f:
+            f.write(nl.join(lineas) + nl)
+        rutas.append(ruta)
+    return rutas
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Genera un corpus COREC sintético (entrada de la etapa 04).")
+    ap.add_argument("raiz", help="raíz COREC falsa (se crea Corpus/TXT/Ren dentro)")
+    ap.add_argument("--archivos", type=int, default=100, help="nº de entrevistas (p. ej. 10 a 10000)")
+    ap.add_argument("--turnos", type=int, default=60, help="turnos medios por entrevista")
+    ap.add_argument("--semilla", type=int, default=1234)
+    args = ap.parse_args()
+
+    rutas = generar_corpus(args.raiz, args.archivos, args.turnos, args.semilla)
+    mb = sum(os.path.getsize(r) for r in rutas) / 1e6
+    print(f"{len(rutas)} entrevistas ({mb:.1f} MB) en {os.path.join(args.raiz, 'Corpus', 'TXT', 'Ren')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+
+"""
+Índice persistente de archivos del corpus COREC (SQLite).
+
+Guarda, para cada raíz recorrida, la ruta relativa, el tamaño, el mtime y
+(opcionalmente) el SHA-256 de cada archivo. En cada consulta el índice se
+refresca de forma incremental: solo se vuelven a listar las carpetas cuyo
+mtime ha cambiado (crear, borrar o renombrar un archivo cambia el mtime de
+su carpeta), de modo que en Google Drive se evita recorrer todo el árbol.
+Las carpetas modificadas poco antes (o poco después) de su último listado se
+vuelven a listar siempre: un archivo creado en el mismo instante que el listado
+no cambiaría el mtime registrado.
+
+Uso desde las etapas (03, 04, 05, 07, 08):
+    import corec_indice
+    rutas = corec_indice.listar_txt(ROOT_IN)
+
+Uso por línea de comandos (refrescar y ver estadísticas):
+    python corec_indice.py Corpus/TXT/Ren [--completo] [--hash]
+
+Base de datos: ~/.cache/corec/indice_corpus.sqlite
+(se puede cambiar con la variable de entorno COREC_INDICE_DB).
+Borrar el archivo fuerza una reconstrucción completa.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+from contextlib import contextmanager
+
+DB_POR_DEFECTO = os.path.join(os.path.expanduser("~"), ".cache", "corec", "indice_corpus.sqlite")
+
+# Una carpeta cuyo mtime no es al menos este margen anterior a su último listado
+# se vuelve a listar (resolución gruesa del mtime, relojes desfasados en red...)
+MARGEN_MTIME_NS = 2 * 10**9
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS directorios (
+    raiz      TEXT NOT NULL,
+    ruta_rel  TEXT NOT NULL,
+    padre     TEXT,
+    mtime_ns  INTEGER NOT NULL,
+    listado_ns INTEGER,
+    PRIMARY KEY (raiz, ruta_rel)
+);
+CREATE TABLE IF NOT EXISTS archivos (
+    raiz      TEXT NOT NULL,
+    ruta_rel  TEXT NOT NULL,
+    dir_rel   TEXT NOT NULL,
+    tamano    INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    sha256    TEXT,
+    PRIMARY KEY (raiz, ruta_rel)
+);
+CREATE INDEX IF NOT EXISTS archivos_dir ON archivos (raiz, dir_rel);
+CREATE INDEX IF NOT EXISTS directorios_padre ON directorios (raiz, padre);
+"""
+
+
+def ruta_db() -> str:
+    return os.environ.get("COREC_INDICE_DB") or DB_POR_DEFECTO
+
+
+@contextmanager
+def conectar(db: str | None = None):
+    """Conexión al índice: confirma los cambios al salir (o los descarta si hay error) y la cierra."""
+    db = db or ruta_db()
+    os.makedirs(os.path.dirname(os.path.abspath(db)), exist_ok=True)
+    con = sqlite3.connect(db)
+    try:
+        con.executescript(ESQUEMA)
+        # índices creados por versiones anteriores (sin hora de listado)
+        if "listado_ns" not in {c[1] for c in con.execute("PRAGMA table_info(directorios)")}:
+            con.execute("ALTER TABLE directorios ADD COLUMN listado_ns INTEGER")
+        with con:
+            yield con
+    finally:
+        con.close()
+
+
+def _unir(base: str, rel: str) -> str:
+    return os.path.join(base, rel) if rel else base
+
+
+def _sha256(ruta: str) -> str:
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _olvidar_directorio(con, raiz, rel):
+    """Elimina del índice una carpeta que ya no existe, con todo su contenido."""
+    if rel == "":
+        # la propia raíz: se olvida todo lo indexado bajo ella
+        con.execute("DELETE FROM directorios WHERE raiz = ?", (raiz,))
+        con.execute("DELETE FROM archivos WHERE raiz = ?", (raiz,))
+        return
+    patron = (rel.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + os.sep + "%")
+    con.execute(
+        "DELETE FROM directorios WHERE raiz = ? AND (ruta_rel = ? OR ruta_rel LIKE ? ESCAPE '\\')",
+        (raiz, rel, patron),
+    )
+    con.execute(
+        "DELETE FROM archivos WHERE raiz = ? AND (dir_rel = ? OR dir_rel LIKE ? ESCAPE '\\')",
+        (raiz, rel, patron),
+    )
+
+
+def _listado_fiable(mtime_ns, listado_ns):
+    """El listado guardado vale si la carpeta no se ha tocado cerca del momento de listarla."""
+    return listado_ns is not None and listado_ns - mtime_ns > MARGEN_MTIME_NS
+
+
+def _listar_directorio(con, raiz, rel, mtime_ns):
+    """Vuelve a listar una carpeta y actualiza sus archivos y subcarpetas en el índice."""
+    previos = {
+        r: (t, m, h)
+        for r, t, m, h in con.execute(
+            "SELECT ruta_rel, tamano, mtime_ns, sha256 FROM archivos WHERE raiz = ? AND dir_rel = ?",
+            (raiz, rel),
+        )
+    }
+    subdirs_previos = {
+        r for (r,) in con.execute(
+            "SELECT ruta_rel FROM directorios WHERE raiz = ? AND padre = ?", (raiz, rel)
+        )
+    }
+
+    archivos, subdirs = [], []
+    listado_ns = time.time_ns()  # antes de listar: lo que cambie después se verá en el siguiente
+    with os.scandir(_unir(raiz, rel)) as it:
+        for e in it:
+            r = _unir(rel, e.name) if rel else e.name
+            if e.is_dir(follow_symlinks=False):
+                subdirs.append(r)
+            elif e.is_file():
+                st = e.stat()
+                anterior = previos.get(r)
+                # el hash se conserva si el archivo no ha cambiado
+                h = anterior[2] if anterior and anterior[:2] == (st.st_size, st.st_mtime_ns) else None
+                archivos.append((raiz, r, rel, st.st_size, st.st_mtime_ns, h))
+
+    con.execute("DELETE FROM archivos WHERE raiz = ? AND dir_rel = ?", (raiz, rel))
+    con.executemany("INSERT INTO archivos VALUES (?, ?, ?, ?, ?, ?)", archivos)
+    for r in subdirs_previos - set(subdirs):
+        _olvidar_directorio(con, raiz, r)
+    con.execute(
+        "INSERT OR REPLACE INTO directorios VALUES (?, ?, ?, ?, ?)",
+        (raiz, rel, None if rel == "" else os.path.dirname(rel), mtime_ns, listado_ns),
+    )
+    return subdirs
+
+
+def refrescar(raiz: str, completo: bool = False, con_hash: bool = False, db: str | None = None) -> dict:
+    """
+    Actualiza el índice de `raiz` y devuelve estadísticas del refresco.
+
+    - completo=False: solo se listan las carpetas nuevas, con mtime distinto o con
+      un mtime a menos de MARGEN_MTIME_NS de su último listado.
+      Los cambios de contenido de un archivo existente no cambian el mtime de su
+      carpeta; con completo=True se vuelven a listar (y a leer los stat) todas.
+    - con_hash=True: calcula el SHA-256 de los archivos que aún no lo tienen o
+      cuyo tamaño/mtime ha cambiado (un stat por archivo).
+    """
+    raiz = os.path.abspath(raiz)
+    t0 = time.perf_counter()
+    est = {"carpetas": 0, "carpetas_listadas": 0, "hashes": 0}
+
+    with conectar(db) as con:
+        if not os.path.isdir(raiz):
+            _olvidar_directorio(con, raiz, "")
+            est["segundos"] = time.perf_counter() - t0
+            return est
+
+        guardados = {
+            r: (m, l) for r, m, l in con.execute(
+                "SELECT ruta_rel, mtime_ns, listado_ns FROM directorios WHERE raiz = ?", (raiz,)
+            )
+        }
+
+        pendientes = [""]
+        while pendientes:
+            rel = pendientes.pop()
+            try:
+                mtime_ns = os.stat(_unir(raiz, rel)).st_mtime_ns
+            except FileNotFoundError:
+                _olvidar_directorio(con, raiz, rel)
+                continue
+            est["carpetas"] += 1
+            guardado = guardados.get(rel)
+            if (not completo and guardado is not None and guardado[0] == mtime_ns
+                    and _listado_fiable(mtime_ns, guardado[1])):
+                # sin cambios: las subcarpetas se toman del índice (pero se revisan una a una)
+                pendientes.extend(r for (r,) in con.execute(
+                    "SELECT ruta_rel FROM directorios WHERE raiz = ? AND padre = ?", (raiz, rel)
+                ))
+                continue
+            est["carpetas_listadas"] += 1
+            pendientes.extend(_listar_directorio(con, raiz, rel, mtime_ns))
+
+        if con_hash:
+            # los hashes se comprueban contra el stat actual de cada archivo
+            for r, tamano, mtime, sha in con.execute(
+                "SELECT ruta_rel, tamano, mtime_ns, sha256 FROM archivos WHERE raiz = ?", (raiz,)
+            ).fetchall():
+                try:
+                    st = os.stat(_unir(raiz, r))
+                except FileNotFoundError:
+                    con.execute("DELETE FROM archivos WHERE raiz = ? AND ruta_rel = ?", (raiz, r))
+                    continue
+                if sha is None or (tamano, mtime) != (st.st_size, st.st_mtime_ns):
+                    con.execute(
+                        "UPDATE archivos SET tamano = ?, mtime_ns = ?, sha256 = ? WHERE raiz = ? AND ruta_rel = ?",
+                        (st.st_size, st.st_mtime_ns, _sha256(_unir(raiz, r)), raiz, r),
+                    )
+                    est["hashes"] += 1
+
+        est["archivos"] = con.execute(
+            "SELECT COUNT(*) FROM archivos WHERE raiz = ?", (raiz,)
+        ).fetchone()[0]
+
+    est["segundos"] = time.perf_counter() - t0
+    return est
+
+
+def archivos(raiz: str, extension: str = ".txt", refrescar_antes: bool = True, db: str | None = None,
+             ignorar_mayusculas: bool = False):
+    """
+    Filas (ruta_rel, tamano, mtime_ns, sha256) de `raiz` con esa extensión, ordenadas por ruta.
+    La extensión distingue mayúsculas (como rglob("*.txt")) salvo con ignorar_mayusculas=True
+    (como os.walk + name.lower().endswith(".txt")).
+    """
+    if refrescar_antes:
+        refrescar(raiz, db=db)
+    raiz = os.path.abspath(raiz)
+    with conectar(db) as con:
+        filas = con.execute(
+            "SELECT ruta_rel, tamano, mtime_ns, sha256 FROM archivos WHERE raiz = ? ORDER BY ruta_rel",
+            (raiz,),
+        ).fetchall()
+    if ignorar_mayusculas:
+        return [f for f in filas if f[0].lower().endswith(extension.lower())]
+    return [f for f in filas if f[0].endswith(extension)]
+
+
+def listar_txt(raiz: str, relativas: bool = False, db: str | None = None,
+               ignorar_mayusculas: bool = False) -> list[str]:
+    """
+    Rutas de los .txt bajo `raiz` (recursivo, orden alfabético). Cada etapa pasa el
+    mismo criterio de mayúsculas que su recorrido sin índice, para obtener los mismos archivos.
+    """
+    filas = archivos(raiz, ".txt", db=db, ignorar_mayusculas=ignorar_mayusculas)
+    if relativas:
+        return [r for r, *_ in filas]
+    return [os.path.join(raiz, r) for r, *_ in filas]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Refresca el índice persistente de archivos del COREC.")
+    ap.add_argument("raices", nargs="+", help="carpetas a indexar")
+    ap.add_argument("--completo", action="store_true", help="volver a listar todas las carpetas")
+    ap.add_argument("--hash", action="store_true", help="calcular SHA-256 de los archivos nuevos o modificados")
+    args = ap.parse_args()
+
+    print("Índice:", ruta_db())
+    for raiz in args.raices:
+        est = refrescar(raiz, completo=args.completo, con_hash=args.hash)
+        print(
+            f"{raiz}: {est.get('archivos', 0)} archivos | "
+            f"{est['carpetas_listadas']}/{est['carpetas']} carpetas listadas | "
+            f"{est['hashes']} hashes | {est['segundos']:.2f} s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
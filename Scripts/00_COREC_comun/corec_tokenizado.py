@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+"""
+Formato intermedio tokenizado del corpus COREC (NumPy + vocabulario JSON).
+
+Las etapas 05, 07 y 08-I leen los mismos TXT y vuelven a separar en cada
+ejecución las etiquetas de turno con su propia expresión regular. Este módulo
+lee una carpeta una sola vez y guarda, por cada línea con contenido:
+
+- archivo y número de línea de origen,
+- etiqueta de turno (E, I1, INF...) o -1 si la línea continúa el turno anterior,
+- rol (1 = informante, 2 = entrevistador, 0 = línea sin etiqueta),
+- el texto tras la etiqueta (sin modificar) y sus tokens (separados por espacios)
+  como identificadores de un vocabulario común.
+
+La "gramática" es la expresión regular de turno de la propia etapa (TAG_TURN de
+05/07, LABEL_RE de 08-I): forma parte de la clave del caché, de modo que las
+etapas con la misma expresión comparten el formato y, si una expresión cambia,
+el formato se reconstruye. También se reconstruye si cambia el tamaño o la fecha
+de modificación de algún TXT, o la lista de TXT.
+
+Los arrays se abren con np.load(mmap_mode="r"): la etapa solo lee del disco las
+partes que usa.
+
+Uso desde las etapas:
+    import corec_tokenizado
+    tk = corec_tokenizado.obtener(ROOT_IN, rutas, TAG_TURN, etiqueta=1, texto=2)
+    for linea, etiqueta, rol, texto in tk.lineas(ruta):
+        ...
+
+Uso por línea de comandos (construir o comprobar el formato con TAG_TURN de 05/07):
+    python corec_tokenizado.py Corpus/TXT/Ren_limpio_fase_0
+
+Caché: ~/.cache/corec/tokenizado/ (se puede cambiar con la variable de entorno
+COREC_TOKENIZADO_DIR). Borrar la carpeta fuerza la reconstrucción.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from array import array
+
+import numpy as np
+
+FORMATO = 1
+DIR_POR_DEFECTO = os.path.join(os.path.expanduser("~"), ".cache", "corec", "tokenizado")
+
+# Etiquetas de turno de las etapas 05 y 07 (gramática por defecto de la línea de comandos)
+TAG_LABEL = r'(?:INF|ENT|E|I|C)(?:\d+)?'
+TAG_SEQ   = rf'(?:{TAG_LABEL}(?:/{TAG_LABEL})*)'
+TAG_TURN  = re.compile(rf'^\s*({TAG_SEQ})\s*:?\s*(.*)$')
+
+ROLES = ["", "INF", "ENT"]
+CORCHETES = set("[(<{")
+
+REGISTRO = np.dtype([
+    ("archivo", "<i4"),
+    ("linea", "<i4"),
+    ("etiqueta", "<i4"),
+    ("rol", "i1"),
+    ("corchetes", "?"),
+    ("tok_ini", "<i8"),
+    ("tok_fin", "<i8"),
+    ("txt_ini", "<i8"),
+    ("txt_fin", "<i8"),
+])
+
+
+def dir_cache() -> str:
+    return os.environ.get("COREC_TOKENIZADO_DIR") or DIR_POR_DEFECTO
+
+
+def rol_de_etiqueta(etiqueta: str) -> int:
+    """1 = informante (I, INF, C...), 2 = entrevistador (E, ENT...). Mismo criterio que 05 y 08."""
+    return 2 if etiqueta.upper().startswith("E") else 1
+
+
+def clave_gramatica(patron, etiqueta, texto, solo_etiquetadas, errores) -> dict:
+    return {
+        "patron": patron.pattern,
+        "flags": int(patron.flags),
+        "etiqueta": etiqueta,
+        "texto": texto,
+        "solo_etiquetadas": solo_etiquetadas,
+        "errores": errores,
+    }
+
+
+def _carpeta(raiz: str, gramatica: dict) -> str:
+    h = hashlib.sha256(json.dumps([os.path.abspath(raiz), gramatica], sort_keys=True).encode("utf-8"))
+    return os.path.join(dir_cache(), h.hexdigest()[:20])
+
+
+def _firmas(raiz: str, rutas) -> list:
+    """[ruta relativa, tamaño, mtime_ns] de cada TXT, en orden de ruta relativa."""
+    firmas = []
+    for ruta in rutas:
+        st = os.stat(ruta)
+        firmas.append([os.path.relpath(ruta, raiz).replace(os.sep, "/"), st.st_size, st.st_mtime_ns])
+    firmas.sort()
+    return firmas
+
+
+class _ArrayEnDisco:
+    """
+    Array 1-D que se escribe por partes en `ruta` + ".bin" y al cerrar se convierte
+    en un .npy (cabecera + copia secuencial de los datos), sin tenerlo entero en memoria.
+    """
+
+    def __init__(self, ruta: str, dtype):
+        self.ruta = ruta
+        self.dtype = np.dtype(dtype)
+        self.n = 0
+        self._f = open(ruta + ".bin", "wb")
+
+    def escribir(self, datos):
+        datos = np.asarray(datos, dtype=self.dtype)
+        datos.tofile(self._f)
+        self.n += len(datos)
+
+    def cerrar(self):
+        self._f.close()
+        cabecera = {
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": (self.n,),
+        }
+        with open(self.ruta, "wb") as f, open(self.ruta + ".bin", "rb") as datos:
+            np.lib.format.write_array_header_1_0(f, cabecera)
+            shutil.copyfileobj(datos, f, 1 << 20)
+        os.remove(self.ruta + ".bin")
+
+
+def construir(raiz, firmas, gramatica, patron, destino):
+    """
+    Lee todos los TXT y escribe el formato tokenizado en `destino`.
+    Los registros, tokens y texto de cada TXT se vuelcan al disco al terminar ese TXT:
+    en memoria solo quedan el vocabulario, las etiquetas y los datos del TXT en curso.
+    """
+    grupo_etq, grupo_txt = gramatica["etiqueta"], gramatica["texto"]
+    solo_etiquetadas = gramatica["solo_etiquetadas"]
+
+    os.makedirs(destino, exist_ok=True)
+    salida = {
+        "registros": _ArrayEnDisco(os.path.join(destino, "registros.npy"), REGISTRO),
+        "tokens": _ArrayEnDisco(os.path.join(destino, "tokens.npy"), "<i4"),
+        "texto": _ArrayEnDisco(os.path.join(destino, "texto.npy"), np.uint8),
+    }
+    vocab, etiquetas = {}, {}
+    archivo_ini = []
+    n_tokens = n_texto = 0  # posiciones globales al empezar cada TXT
+
+    for i, (rel, _, _) in enumerate(firmas):
+        archivo_ini.append(salida["registros"].n)
+        registros, tokens, texto = [], array("i"), bytearray()
+        with open(os.path.join(raiz, *rel.split("/")), "r", encoding="utf-8", errors=gramatica["errores"]) as f:
+            for n, raw in enumerate(f, start=1):
+                linea = raw.rstrip("\n")
+                m = patron.match(linea)
+                if m:
+                    etq = m.group(grupo_etq)
+                    contenido = m.group(grupo_txt)
+                    id_etq = etiquetas.setdefault(etq, len(etiquetas))
+                    rol = rol_de_etiqueta(etq)
+                elif solo_etiquetadas or not linea.strip():
+                    continue
+                else:
+                    contenido, id_etq, rol = linea, -1, 0
+
+                tok_ini = n_tokens + len(tokens)
+                tokens.extend(vocab.setdefault(t, len(vocab)) for t in contenido.split())
+                txt_ini = n_texto + len(texto)
+                texto += contenido.encode("utf-8")
+                registros.append((
+                    i, n, id_etq, rol, not CORCHETES.isdisjoint(contenido),
+                    tok_ini, n_tokens + len(tokens), txt_ini, n_texto + len(texto),
+                ))
+        salida["registros"].escribir(np.array(registros, dtype=REGISTRO))
+        salida["tokens"].escribir(np.frombuffer(tokens, dtype=np.intc) if tokens else [])
+        salida["texto"].escribir(np.frombuffer(texto, dtype=np.uint8))
+        n_tokens += len(tokens)
+        n_texto += len(texto)
+    archivo_ini.append(salida["registros"].n)
+
+    for columna in salida.values():
+        columna.cerrar()
+    np.save(os.path.join(destino, "archivo_ini.npy"), np.array(archivo_ini, dtype=np.int64))
+    with open(os.path.join(destino, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(list(vocab), f, ensure_ascii=False)
+    # meta.json se escribe al final: sin él, la carpeta no se considera válida
+    meta = {
+        "formato": FORMATO,
+        "raiz": os.path.abspath(raiz),
+        "gramatica": gramatica,
+        "etiquetas": list(etiquetas),
+        "archivos": firmas,
+    }
+    with open(os.path.join(destino, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+class Tokenizado:
+    """Formato tokenizado de una carpeta, abierto en modo mmap."""
+
+    def __init__(self, carpeta: str):
+        self.carpeta = carpeta
+        with open(os.path.join(carpeta, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.raiz = self.meta["raiz"]
+        self.etiquetas = self.meta["etiquetas"]
+        self.archivos = [rel for rel, _, _ in self.meta["archivos"]]
+        self._posicion = {rel: i for i, rel in enumerate(self.archivos)}
+        self.registros = np.load(os.path.join(carpeta, "registros.npy"), mmap_mode="r")
+        self.tokens = np.load(os.path.join(carpeta, "tokens.npy"), mmap_mode="r")
+        self.texto = np.load(os.path.join(carpeta, "texto.npy"), mmap_mode="r")
+        self.archivo_ini = np.load(os.path.join(carpeta, "archivo_ini.npy"))
+        self._vocab = None
+
+    @property
+    def vocab(self) -> list:
+        """Token de cada identificador (se carga la primera vez que se usa)."""
+        if self._vocab is None:
+            with open(os.path.join(self.carpeta, "vocab.json"), encoding="utf-8") as f:
+                self._vocab = json.load(f)
+        return self._vocab
+
+    def indice(self, ruta: str) -> int:
+        return self._posicion[os.path.relpath(ruta, self.raiz).replace(os.sep, "/")]
+
+    def registros_de(self, ruta: str):
+        """Registros (array estructurado) de un TXT, en orden de línea."""
+        i = self.indice(ruta)
+        return self.registros[self.archivo_ini[i]:self.archivo_ini[i + 1]]
+
+    def texto_de(self, reg) -> str:
+        return self.texto[reg["txt_ini"]:reg["txt_fin"]].tobytes().decode("utf-8")
+
+    def tokens_de(self, reg):
+        return self.tokens[reg["tok_ini"]:reg["tok_fin"]]
+
+    def lineas(self, ruta: str):
+        """(nº de línea, etiqueta o None, rol "INF"/"ENT" o "", texto) de cada registro de un TXT."""
+        regs = self.registros_de(ruta)
+        if not len(regs):
+            return
+        t0, t1 = int(regs["txt_ini"][0]), int(regs["txt_fin"][-1])
+        bloque = self.texto[t0:t1].tobytes()
+        for linea, etq, rol, a, b in zip(
+            regs["linea"].tolist(), regs["etiqueta"].tolist(), regs["rol"].tolist(),
+            regs["txt_ini"].tolist(), regs["txt_fin"].tolist(),
+        ):
+            yield (
+                linea,
+                self.etiquetas[etq] if etq >= 0 else None,
+                ROLES[rol],
+                bloque[a - t0:b - t0].decode("utf-8"),
+            )
+
+
+def obtener(raiz: str, rutas, patron, etiqueta=1, texto=2,
+            solo_etiquetadas: bool = False, errores: str = "ignore") -> Tokenizado:
+    """
+    Devuelve el formato tokenizado de los TXT `rutas` (bajo `raiz`) con la gramática
+    indicada, construyéndolo antes si no existe o si algún TXT ha cambiado.
+
+    - patron: expresión regular de turno de la etapa (compilada).
+    - etiqueta / texto: grupos de `patron` con la etiqueta y con el resto de la línea.
+    - solo_etiquetadas: True guarda solo las líneas que encajan con `patron` (UDs de 08);
+      False guarda también las líneas de continuación de turno (05, 07).
+    - errores: tratamiento de bytes no UTF-8 al leer, como en la etapa ("ignore"/"replace").
+    """
+    gramatica = clave_gramatica(patron, etiqueta, texto, solo_etiquetadas, errores)
+    carpeta = _carpeta(raiz, gramatica)
+    firmas = _firmas(raiz, rutas)
+
+    try:
+        with open(os.path.join(carpeta, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["formato"] == FORMATO and meta["gramatica"] == gramatica and meta["archivos"] == firmas:
+            return Tokenizado(carpeta)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    # se construye aparte y se sustituye al final: una interrupción no deja un formato a medias
+    temporal = carpeta + ".tmp"
+    shutil.rmtree(temporal, ignore_errors=True)
+    construir(raiz, firmas, gramatica, patron, temporal)
+    shutil.rmtree(carpeta, ignore_errors=True)
+    os.replace(temporal, carpeta)
+    return Tokenizado(carpeta)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Construye o comprueba el formato tokenizado (TAG_TURN de 05/07).")
+    ap.add_argument("raices", nargs="+", help="carpetas de TXT")
+    args = ap.parse_args()
+
+    print("Caché:", dir_cache())
+    for raiz in args.raices:
+        t0 = time.perf_counter()
+        rutas = [
+            os.path.join(dp, name)
+            for dp, _, files in os.walk(raiz)
+            for name in files
+            if name.lower().endswith(".txt")
+        ]
+        tk = obtener(raiz, rutas, TAG_TURN)
+        print(
+            f"{raiz}: {len(tk.archivos)} archivos | {len(tk.registros)} líneas | "
+            f"{len(tk.tokens)} tokens | {len(tk.vocab)} formas | {time.perf_counter() - t0:.2f} s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
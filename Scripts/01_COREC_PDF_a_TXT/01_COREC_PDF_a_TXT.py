@@ -6,6 +6,9 @@ Conversión de PDFs (contenidos en un ZIP) a TXT.
 
 - En Google Colab: monta Google Drive automáticamente.
 - En entorno local: omite el montaje y usa rutas locales en zip_path/extract_path/txt_output.
+- Con N_WORKERS > 1 la conversión se reparte entre varios procesos.
+- Con LEER_DESDE_ZIP = True los PDFs se leen directamente del ZIP (sin carpeta extract_path).
+- Con INCREMENTAL = True solo se convierten los PDFs nuevos o modificados (manifiesto de huellas).
 """
 
 # === (Opcional) Montaje de Google Drive si estás en Colab ===
@@ -20,34 +23,371 @@ zip_path = "/content/drive/MyDrive/COREC/PDFs/<paquete_pdf_originales>.zip"
 extract_path = "/content/drive/MyDrive/COREC/PDFs/extraidos"
 txt_output = "/content/drive/MyDrive/COREC/TXT"
 
+# Nº de procesos para convertir PDFs (1 = secuencial, como siempre)
+N_WORKERS = 1
+
+# True: lee cada PDF del ZIP en memoria y no crea la copia en extract_path
+LEER_DESDE_ZIP = False
+
+# True: no reconvierte los PDFs cuyo contenido no ha cambiado desde la última ejecución
+INCREMENTAL = True
+MANIFEST_PATH = f"{txt_output}/_manifest_pdf_a_txt.json"
+
+# Cada cuántas páginas se guarda el punto de control para reanudar PDFs largos
+# (cada punto de control escribe y renombra un JSON: en Drive, una consulta de metadatos)
+CHECKPOINT_PAGINAS = 10
+
+# CSV con tiempos por PDF (páginas, bytes, segundos, caracteres/s). None = no se escribe
+TIEMPOS_CSV = f"{txt_output}/_tiempos_pdf_a_txt.csv"
+
 import os
+import csv
+import json
+import time
+import hashlib
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import fitz  # PyMuPDF
 
-os.makedirs(extract_path, exist_ok=True)
-os.makedirs(txt_output, exist_ok=True)
 
-# 1) Extraer ZIP
-with zipfile.ZipFile(zip_path, "r") as z:
-    z.extractall(extract_path)
+# --------- MANIFIESTO (huellas PDF -> TXT) ---------
+def sha256_de(f, bloque=1 << 20, copia=None):
+    """Huella de f; con copia (archivo abierto en "wb") se escribe a la vez el contenido."""
+    h = hashlib.sha256()
+    for trozo in iter(lambda: f.read(bloque), b""):
+        h.update(trozo)
+        if copia is not None:
+            copia.write(trozo)
+    return h.hexdigest()
+
+
+def cargar_manifest(ruta):
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f).get("archivos", {})
+    except (OSError, ValueError):
+        print("⚠ Manifiesto ilegible: se reconvierte todo.")
+        return {}
+
+
+def guardar_manifest(ruta, archivos):
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "archivos": archivos}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, ruta)
+
+
+def podar_manifest(manifest, nombre_zip, nombres_txt):
+    """
+    Quita las entradas de este ZIP cuyo PDF ya no está en él (borrado o renombrado) y
+    devuelve sus claves. Las entradas de otros ZIP con la misma txt_output se conservan.
+    """
+    quitadas = sorted(
+        clave for clave, entrada in manifest.items()
+        if entrada.get("zip") == nombre_zip and clave not in nombres_txt
+    )
+    for clave in quitadas:
+        del manifest[clave]
+    return quitadas
+
+
+def posible_reutilizable(entrada, info):
+    """
+    Comprobación barata con la cabecera del ZIP (CRC-32 y tamaño, sin descomprimir):
+    si no coinciden con el manifiesto, el PDF es nuevo o ha cambiado y no hace falta
+    calcular su SHA-256 por adelantado. Los manifiestos antiguos (sin CRC) se comprueban.
+    """
+    if not entrada or "sha256_pdf" not in entrada:
+        return False
+    return (entrada.get("crc32", info.CRC) == info.CRC
+            and entrada.get("tamano_pdf", info.file_size) == info.file_size)
+
+
+def txt_reutilizable(entrada, sha_pdf, ruta_txt):
+    """El TXT vale si procede del mismo PDF y no se ha modificado desde entonces."""
+    if not entrada or entrada.get("sha256_pdf") != sha_pdf:
+        return False
+    if not os.path.exists(ruta_txt):
+        return False
+    with open(ruta_txt, "rb") as f:
+        return sha256_de(f) == entrada.get("sha256_txt")
+
+
+# --------- ABRIR UN PDF (carpeta o miembro del ZIP) ---------
+def abrir_pdf(ruta_pdf, miembro=None):
+    """
+    Devuelve (documento, tamaño del PDF en bytes, sha256 del PDF).
+    La huella solo se calcula para miembros del ZIP, sobre los bytes ya leídos.
+    """
+    if miembro is None:
+        return fitz.open(ruta_pdf), os.path.getsize(ruta_pdf), None
+    # ruta_pdf es el ZIP: el miembro se lee en memoria y se abre como stream
+    with zipfile.ZipFile(ruta_pdf, "r") as z:
+        datos = z.read(miembro)
+    return fitz.open(stream=datos, filetype="pdf"), len(datos), hashlib.sha256(datos).hexdigest()
+
+
+def extraer_pdf(z, miembro, destino):
+    """
+    Extrae el miembro en destino (como ZipFile.extract) y devuelve (ruta, sha256):
+    la huella se calcula mientras se copia, con una sola descompresión.
+    """
+    partes = os.path.splitdrive(miembro)[1].replace("\\", "/").split("/")
+    ruta = os.path.join(destino, *[p for p in partes if p not in ("", ".", "..")])
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with z.open(miembro) as f, open(ruta, "wb") as copia:
+        sha_pdf = sha256_de(f, copia=copia)
+    return ruta, sha_pdf
+
+
+def miembros_pdf(z):
+    """Miembros PDF del ZIP (ignora carpetas y metadatos de macOS)."""
+    miembros = []
+    for info in z.infolist():
+        nombre = info.filename
+        base = os.path.basename(nombre)
+        if info.is_dir() or not base.lower().endswith(".pdf"):
+            continue
+        if nombre.startswith("__MACOSX/") or base.startswith("._"):
+            continue
+        miembros.append(nombre)
+    return sorted(miembros, key=os.path.basename)
+
+
+# --------- PUNTOS DE CONTROL POR PÁGINA ---------
+def leer_progreso(ruta_progreso, ruta_parcial, sha_pdf):
+    """
+    Devuelve (página inicial, bytes ya escritos) para reanudar un TXT a medias.
+    Solo se reanuda si el progreso corresponde al mismo PDF y el parcial está completo.
+    """
+    if sha_pdf is None or not os.path.exists(ruta_progreso) or not os.path.exists(ruta_parcial):
+        return 0, 0
+    try:
+        with open(ruta_progreso, "r", encoding="utf-8") as f:
+            prog = json.load(f)
+    except (OSError, ValueError):
+        return 0, 0
+    if prog.get("sha256_pdf") != sha_pdf or os.path.getsize(ruta_parcial) < prog.get("bytes", 0):
+        return 0, 0
+    return prog.get("paginas", 0), prog.get("bytes", 0)
+
+
+def guardar_progreso(ruta_progreso, sha_pdf, paginas, n_bytes):
+    tmp = ruta_progreso + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"sha256_pdf": sha_pdf, "paginas": paginas, "bytes": n_bytes}, f)
+    os.replace(tmp, ruta_progreso)
+
+
+# --------- CONVERTIR UN PDF ---------
+def convertir_pdf(ruta_pdf, ruta_txt, miembro=None, sha_pdf=None):
+    """
+    Convierte un PDF (o un miembro PDF del ZIP ruta_pdf) a TXT y devuelve
+    (archivo, estado, detalle, sha256_txt, tiempos, sha256_pdf).
+    Los errores se devuelven como estado "ERROR": un PDF dañado no detiene el lote.
+    Cada llamada abre su propio documento PyMuPDF (apto para procesos independientes).
+
+    El texto de cada página se escribe en cuanto se extrae (ruta_txt + ".parcial")
+    y cada CHECKPOINT_PAGINAS se guarda el progreso: si la ejecución se corta,
+    la siguiente reanuda en la última página terminada del mismo PDF (sha_pdf).
+    Si sha_pdf es None y el PDF se lee del ZIP, la huella se calcula al leerlo.
+    """
+    archivo = os.path.basename(miembro if miembro is not None else ruta_pdf)
+    ruta_parcial = ruta_txt + ".parcial"
+    ruta_progreso = ruta_txt + ".progreso.json"
+    t0 = time.perf_counter()
+    n_caracteres = 0
+    try:
+        doc, bytes_pdf, sha_leido = abrir_pdf(ruta_pdf, miembro)
+        if sha_pdf is None:
+            sha_pdf = sha_leido
+        with doc:
+            n_paginas = doc.page_count
+            inicio, n_bytes = leer_progreso(ruta_progreso, ruta_parcial, sha_pdf)
+            if inicio > n_paginas:
+                inicio, n_bytes = 0, 0
+
+            with open(ruta_parcial, "r+b" if inicio else "wb") as f:
+                f.seek(n_bytes)
+                f.truncate()
+                for n in range(inicio, n_paginas):
+                    # mismo resultado que "\n".join(páginas), sin acumular el documento
+                    if n > 0:
+                        f.write(b"\n")
+                    texto = doc[n].get_text()
+                    n_caracteres += len(texto)
+                    f.write(texto.encode("utf-8"))
+                    if sha_pdf is not None and ((n + 1) % CHECKPOINT_PAGINAS == 0 or n + 1 == n_paginas):
+                        f.flush()
+                        guardar_progreso(ruta_progreso, sha_pdf, n + 1, f.tell())
+
+        os.replace(ruta_parcial, ruta_txt)
+        if os.path.exists(ruta_progreso):
+            os.remove(ruta_progreso)
+
+        with open(ruta_txt, "rb") as f:
+            sha_txt = sha256_de(f)
+
+        # las páginas ya escritas en una ejecución anterior no cuentan en el tiempo
+        tiempos = {
+            "paginas": n_paginas - inicio,
+            "bytes_pdf": bytes_pdf,
+            "caracteres": n_caracteres,
+            "segundos": time.perf_counter() - t0,
+        }
+        detalle = f"{n_paginas} páginas"
+        if inicio:
+            detalle += f" (reanudado en la página {inicio + 1})"
+        return archivo, "OK", detalle, sha_txt, tiempos, sha_pdf
+    except Exception as e:
+        return archivo, "ERROR", f"{type(e).__name__}: {e}", None, None, sha_pdf
+
+
+# --------- TIEMPOS POR PDF ---------
+def guardar_tiempos(ruta, resultados):
+    campos = [
+        "archivo", "estado", "paginas", "bytes_pdf", "caracteres", "segundos",
+        "paginas_por_seg", "mb_por_seg", "caracteres_por_seg",
+    ]
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(campos)
+        for archivo, estado, _, _, t, _ in resultados:
+            if t is None:
+                w.writerow([archivo, estado] + [""] * (len(campos) - 2))
+                continue
+            seg = t["segundos"] or 1e-9
+            w.writerow([
+                archivo, estado, t["paginas"], t["bytes_pdf"], t["caracteres"],
+                round(t["segundos"], 4),
+                round(t["paginas"] / seg, 2),
+                round(t["bytes_pdf"] / seg / 1e6, 3),
+                round(t["caracteres"] / seg, 1),
+            ])
+
+
+def main():
+    os.makedirs(txt_output, exist_ok=True)
+    manifest = cargar_manifest(MANIFEST_PATH)
+
+    tareas = []
+    resultados = []
+    reutilizados = []
+    origen = {}  # archivo PDF -> (miembro, nombre_txt, ZipInfo)
+
+    with zipfile.ZipFile(zip_path, "r") as z:
+        miembros = miembros_pdf(z)
+        if LEER_DESDE_ZIP:
+            print(f"PDFs en el ZIP: {len(miembros)} (lectura directa, sin extraer)")
+        else:
+            os.makedirs(extract_path, exist_ok=True)
+            print(f"PDFs en el ZIP: {len(miembros)}")
+
+        for miembro in miembros:
+            archivo = os.path.basename(miembro)
+            if archivo in origen:
+                resultados.append((archivo, "ERROR", f"nombre repetido en el ZIP: {miembro}", None, None, None))
+                continue
+            base = os.path.splitext(archivo)[0]
+            nombre_txt = base + ".txt"
+            ruta_txt = os.path.join(txt_output, nombre_txt)
+
+            info = z.getinfo(miembro)
+            origen[archivo] = (miembro, nombre_txt, info)
+
+            # 1) Huella del PDF: solo se descomprime por adelantado si el CRC y el tamaño
+            #    coinciden con el manifiesto; si además el TXT sigue intacto, se reutiliza
+            entrada = manifest.get(nombre_txt)
+            sha_pdf = None
+            if INCREMENTAL and posible_reutilizable(entrada, info):
+                with z.open(miembro) as f:
+                    sha_pdf = sha256_de(f)
+                if txt_reutilizable(entrada, sha_pdf, ruta_txt):
+                    manifest[nombre_txt] = {**entrada, "crc32": info.CRC, "tamano_pdf": info.file_size}
+                    reutilizados.append(archivo)
+                    continue
+
+            # 2) Solo se extrae (o se lee en memoria) lo que hay que convertir; la huella
+            #    de los PDFs nuevos o modificados se calcula sobre esa misma lectura
+            if LEER_DESDE_ZIP:
+                tareas.append((zip_path, ruta_txt, miembro, sha_pdf))
+            else:
+                ruta_pdf, sha_pdf = extraer_pdf(z, miembro, extract_path)
+                tareas.append((ruta_pdf, ruta_txt, None, sha_pdf))
+
+    if not LEER_DESDE_ZIP and tareas:
+        print("PDFs extraídos en:", extract_path)
+    if reutilizados:
+        print(f"Sin cambios (se reutiliza el TXT): {len(reutilizados)}")
+
+    # 3) Convertir cada PDF pendiente a TXT
+    t0 = time.perf_counter()
+    if N_WORKERS > 1 and len(tareas) > 1:
+        print(f"Convirtiendo {len(tareas)} PDFs con {N_WORKERS} procesos...")
+        with ProcessPoolExecutor(max_workers=N_WORKERS) as ex:
+            futuros = {
+                ex.submit(convertir_pdf, pdf, txt, miembro, sha): miembro or pdf
+                for pdf, txt, miembro, sha in tareas
+            }
+            for fut in as_completed(futuros):
+                try:
+                    res = fut.result()
+                except Exception as e:  # p. ej. proceso caído dentro de MuPDF
+                    res = (os.path.basename(futuros[fut]), "ERROR", f"{type(e).__name__}: {e}", None, None, None)
+                print(f"  [{res[1]}] {res[0]}")
+                resultados.append(res)
+        resultados.sort(key=lambda r: r[0])
+    else:
+        for ruta_pdf, ruta_txt, miembro, sha_pdf in tareas:
+            archivo = os.path.basename(miembro if miembro is not None else ruta_pdf)
+            print(f"Convirtiendo: {archivo} -> {os.path.basename(ruta_txt)}")
+            resultados.append(convertir_pdf(ruta_pdf, ruta_txt, miembro, sha_pdf))
+    segundos_total = time.perf_counter() - t0
 
-print("PDFs extraídos en:", extract_path)
+    # 4) Actualizar el manifiesto (los errores no se registran: se reintentan)
+    for archivo, estado, _, sha_txt, _, sha_pdf in resultados:
+        if estado == "OK":
+            miembro, nombre_txt, info = origen[archivo]
+            manifest[nombre_txt] = {
+                "zip": os.path.basename(zip_path),
+                "miembro": miembro,
+                "crc32": info.CRC,
+                "tamano_pdf": info.file_size,
+                "sha256_pdf": sha_pdf,
+                "sha256_txt": sha_txt,
+            }
+    # sin ningún PDF en el ZIP no se quita nada: es más probable un ZIP equivocado
+    quitadas = []
+    if miembros:
+        nombres_txt = {os.path.splitext(os.path.basename(m))[0] + ".txt" for m in miembros}
+        quitadas = podar_manifest(manifest, os.path.basename(zip_path), nombres_txt)
+    guardar_manifest(MANIFEST_PATH, manifest)
+    if TIEMPOS_CSV and resultados:
+        guardar_tiempos(TIEMPOS_CSV, resultados)
 
-# 2) Convertir cada PDF a TXT
-for archivo in os.listdir(extract_path):
-    if archivo.lower().endswith(".pdf"):
-        ruta_pdf = os.path.join(extract_path, archivo)
-        base = os.path.splitext(archivo)[0]
-        ruta_txt = os.path.join(txt_output, base + ".txt")
+    # 5) Resumen por archivo
+    errores = [r for r in resultados if r[1] != "OK"]
+    print(
+        f"\nResumen: {len(resultados) - len(errores)} convertidos, "
+        f"{len(reutilizados)} reutilizados, {len(errores)} con error"
+    )
+    for archivo, _, detalle, _, _, _ in errores:
+        print(f"  ❌ {archivo}: {detalle}")
+    if quitadas:
+        print(f"Quitados del manifiesto (PDF ya no está en el ZIP; el TXT se conserva): {len(quitadas)}")
+        for clave in quitadas:
+            print(f"  🗑 {clave}")
 
-        print(f"Convirtiendo: {archivo} -> {base}.txt")
+    paginas = sum(r[4]["paginas"] for r in resultados if r[4])
+    if paginas:
+        print(f"Tiempo de conversión: {segundos_total:.1f} s ({paginas / max(segundos_total, 1e-9):.1f} páginas/s)")
+    if TIEMPOS_CSV and resultados:
+        print("Tiempos por PDF en:", TIEMPOS_CSV)
 
-        texto_total = []
-        with fitz.open(ruta_pdf) as doc:
-            for pagina in doc:
-                texto_total.append(pagina.get_text())
+    print("CONVERSION COMPLETA")
 
-        with open(ruta_txt, "w", encoding="utf-8") as f:
-            f.write("\n".join(texto_total))
 
-print("CONVERSION COMPLETA")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+01_COREC_benchmark_PDF_a_TXT
+
+Benchmark reproducible de 01_COREC_PDF_a_TXT.
+
+- Genera PDFs sintéticos de varias páginas con PyMuPDF (misma semilla = mismos PDFs).
+- Los empaqueta en un ZIP y ejecuta la etapa 01 completa (main) con distintos N_WORKERS.
+- Compara el rendimiento secuencial y en paralelo (páginas/s, MB/s, caracteres/s).
+
+Uso:
+    python 01_COREC_benchmark_PDF_a_TXT.py --pdfs 40 --paginas 30 --workers 1,2,4
+"""
+
+import os
+import io
+import sys
+import csv
+import time
+import random
+import shutil
+import zipfile
+import argparse
+import tempfile
+import importlib
+from contextlib import redirect_stdout
+
+import fitz  # PyMuPDF
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+
+PALABRAS = (
+    "pues entonces nosotros íbamos al pueblo con mi abuela y allí se hablaba "
+    "la lengua de casa pero en la escuela nos decían que teníamos que hablar "
+    "en castellano porque si no los maestros se enfadaban y bueno así fue"
+).split()
+
+
+def generar_pdfs(destino, n_pdfs, n_paginas, semilla):
+    """Crea un ZIP con n_pdfs PDFs de n_paginas páginas de entrevista sintética."""
+    rnd = random.Random(semilla)
+    ruta_zip = os.path.join(destino, "benchmark_pdfs.zip")
+    with zipfile.ZipFile(ruta_zip, "w", zipfile.ZIP_DEFLATED) as z:
+        for i in range(n_pdfs):
+            doc = fitz.open()
+            for p in range(n_paginas):
+                lineas = [f"COREC {i:03d}", str(p + 1)]
+                for t in range(rnd.randint(12, 20)):
+                    etiqueta = "E" if t % 2 == 0 else "I"
+                    frase = " ".join(rnd.choice(PALABRAS) for _ in range(rnd.randint(6, 14)))
+                    lineas.append(f"{etiqueta}: {frase} /")
+                pagina = doc.new_page()
+                pagina.insert_textbox(fitz.Rect(50, 50, 550, 800), "\n".join(lineas), fontsize=9)
+            z.writestr(f"99_01_{i + 1}.pdf", doc.tobytes())
+            doc.close()
+    return ruta_zip
+
+
+def cargar_etapa_01():
+    # el nombre empieza por dígito: se importa por ruta (también desde procesos hijos)
+    if CARPETA not in sys.path:
+        sys.path.insert(0, CARPETA)
+    with redirect_stdout(io.StringIO()):
+        return importlib.import_module("01_COREC_PDF_a_TXT")
+
+
+def medir(etapa, ruta_zip, destino, workers, leer_desde_zip):
+    salida = os.path.join(destino, f"txt_w{workers}")
+    shutil.rmtree(salida, ignore_errors=True)
+    shutil.rmtree(os.path.join(destino, "extraidos"), ignore_errors=True)
+
+    etapa.zip_path = ruta_zip
+    etapa.extract_path = os.path.join(destino, "extraidos")
+    etapa.txt_output = salida
+    etapa.N_WORKERS = workers
+    etapa.LEER_DESDE_ZIP = leer_desde_zip
+    etapa.INCREMENTAL = False
+    etapa.MANIFEST_PATH = os.path.join(salida, "_manifest_pdf_a_txt.json")
+    etapa.TIEMPOS_CSV = os.path.join(salida, "_tiempos_pdf_a_txt.csv")
+
+    t0 = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        etapa.main()
+    segundos = time.perf_counter() - t0
+
+    paginas = n_bytes = caracteres = archivos = 0
+    with open(etapa.TIEMPOS_CSV, encoding="utf-8") as f:
+        for fila in csv.DictReader(f, delimiter=";"):
+            if fila["estado"] != "OK":
+                continue
+            archivos += 1
+            paginas += int(fila["paginas"])
+            n_bytes += int(fila["bytes_pdf"])
+            caracteres += int(fila["caracteres"])
+    return {
+        "workers": workers,
+        "archivos": archivos,
+        "paginas": paginas,
+        "segundos": segundos,
+        "paginas_por_seg": paginas / segundos,
+        "mb_por_seg": n_bytes / segundos / 1e6,
+        "caracteres_por_seg": caracteres / segundos,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de la conversión PDF -> TXT (etapa 01).")
+    ap.add_argument("--pdfs", type=int, default=40, help="nº de PDFs sintéticos")
+    ap.add_argument("--paginas", type=int, default=30, help="páginas por PDF")
+    ap.add_argument("--workers", default="1,2,4", help="lista de N_WORKERS a comparar (ej. 1,2,4)")
+    ap.add_argument("--semilla", type=int, default=1234)
+    ap.add_argument("--carpeta", choices=["zip", "extraidos"], default="zip",
+                    help="leer los PDFs del ZIP (LEER_DESDE_ZIP) o extraerlos antes")
+    ap.add_argument("--dir", default=None, help="carpeta de trabajo (por defecto, temporal)")
+    args = ap.parse_args()
+
+    destino = args.dir or tempfile.mkdtemp(prefix="corec_bench_01_")
+    os.makedirs(destino, exist_ok=True)
+
+    print(f"Generando {args.pdfs} PDFs x {args.paginas} páginas en {destino} ...")
+    ruta_zip = generar_pdfs(destino, args.pdfs, args.paginas, args.semilla)
+    print(f"ZIP: {ruta_zip} ({os.path.getsize(ruta_zip) / 1e6:.1f} MB)")
+
+    etapa = cargar_etapa_01()
+    filas = []
+    for w in [int(x) for x in args.workers.split(",") if x.strip()]:
+        filas.append(medir(etapa, ruta_zip, destino, w, args.carpeta == "zip"))
+
+    base = filas[0]["segundos"] if filas else 1.0
+    print(f"\n{'workers':>7} {'PDFs':>5} {'páginas':>8} {'seg':>8} {'pág/s':>9} {'MB/s':>7} {'car/s':>11} {'speedup':>8}")
+    for r in filas:
+        print(
+            f"{r['workers']:>7} {r['archivos']:>5} {r['paginas']:>8} {r['segundos']:>8.2f} "
+            f"{r['paginas_por_seg']:>9.1f} {r['mb_por_seg']:>7.2f} {r['caracteres_por_seg']:>11.0f} "
+            f"{base / r['segundos']:>7.2f}x"
+        )
+
+    if not args.dir:
+        shutil.rmtree(destino, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 import pandas as pd
 from pathlib import Path
 import shutil
+import zipfile
 import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Colab opcional ---
 try:
@@ -25,48 +27,263 @@ carpeta_salida = Path("/content/Ren_Gijon")# cambia el nombre por el enclave/lot
 
 # Limpieza opcional (como en tu versión original)
 LIMPIAR_TXT_EN_CONTENT = False            # True si quieres borrar /content/*.txt antes de empezar
+
+# Cómo se genera la salida:
+#   "copia"    -> copia los TXT a carpeta_salida y después crea el ZIP (comportamiento original)
+#   "zip"      -> escribe los TXT renombrados directamente en el ZIP, sin carpeta intermedia
+#   "hardlink" -> carpeta_salida con enlaces duros a los originales (sin copiar datos) + ZIP
+#   "reflink"  -> carpeta_salida con copias reflink/CoW (Btrfs, XFS...) + ZIP
+# Si el enlace no es posible (otro disco, Drive, FS sin CoW) se hace una copia normal.
+MODO_SALIDA = "copia"
+
+# --- Modo corpus completo (opcional) ---
+# True: ignora fila_inicio/fila_fin_excl/prefijo_archivos/carpeta_salida y construye
+# en una pasada el plan prefijo -> rango de IDs de TODO ids.csv; valida todos los
+# lotes antes de empezar y los renombra/empaqueta en paralelo.
+MODO_CORPUS = False
+COL_PREFIJO = "prefijo"                   # columna de ids.csv con el prefijo de los TXT (ej. 11_01)
+COL_LOTE = "Parte del nombre"             # columna con el enclave -> carpeta Ren_<enclave>
+carpeta_salida_base = Path("/content/")   # donde se crean las carpetas/ZIP Ren_<enclave>
+N_HILOS = 4                               # lotes empaquetados a la vez
 # =========================
 
+
+# --------- ENLAZAR O COPIAR UN TXT ---------
+FICLONE = 0x40049409  # ioctl de Linux para clonar un archivo (reflink)
+
+def enlazar_o_copiar(origen: Path, destino: Path, modo: str) -> str:
+    """Crea destino a partir de origen según el modo; devuelve el método usado."""
+    if destino.exists():
+        destino.unlink()
+    if modo == "hardlink":
+        try:
+            os.link(origen, destino)
+            return "hardlink"
+        except OSError:
+            pass
+    elif modo == "reflink":
+        try:
+            import fcntl
+            with open(origen, "rb") as fo, open(destino, "wb") as fd:
+                fcntl.ioctl(fd.fileno(), FICLONE, fo.fileno())
+            shutil.copystat(origen, destino)
+            return "reflink"
+        except (ImportError, OSError):
+            if destino.exists():
+                destino.unlink()
+    shutil.copy2(origen, destino)
+    return "copia"
+
+
+# --------- ZIP DE UNA CARPETA ---------
+def zip_de_carpeta(carpeta: Path, zip_path: str):
+    """
+    Mismo ZIP que shutil.make_archive(carpeta, "zip", carpeta), con rutas relativas
+    (arcname) en lugar de cambiar el directorio actual: antes de Python 3.10.6,
+    make_archive hace chdir, que afecta a todo el proceso y no es seguro con hilos.
+    """
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for raiz, subdirs, nombres in os.walk(carpeta):
+            subdirs.sort()
+            for nombre in subdirs + sorted(nombres):
+                ruta = os.path.join(raiz, nombre)
+                if nombre in nombres and not os.path.isfile(ruta):
+                    continue
+                zf.write(ruta, arcname=os.path.relpath(ruta, carpeta))
+
+
+# --------- EMPAQUETAR UN LOTE ---------
+def empaquetar(archivos, ids, carpeta_salida: Path, modo: str = "copia", detalle: bool = True) -> str:
+    """Renombra los TXT del lote por ID y genera el ZIP; devuelve la ruta del ZIP."""
+    zip_path = str(carpeta_salida) + ".zip"
+
+    if modo == "zip":
+        # Sin carpeta intermedia: cada TXT se lee una sola vez y va directo al ZIP.
+        # Como en "copia", los miembros de ejecuciones anteriores (otro prefijo del mismo
+        # enclave) se conservan y los que tienen el mismo nombre se sustituyen
+        nuevos = {f"{nuevo_id}.txt" for nuevo_id in ids}
+        previos = []
+        if os.path.exists(zip_path):
+            with zipfile.ZipFile(zip_path, "r") as zf:
+                previos = zf.namelist()
+        if nuevos.isdisjoint(previos):
+            destino = zip_path  # se añade al ZIP existente (o se crea)
+        else:
+            # hay que sustituir miembros: se reconstruye en un temporal
+            destino = zip_path + ".tmp"
+        with zipfile.ZipFile(destino, "a" if destino == zip_path else "w", zipfile.ZIP_DEFLATED) as zf:
+            if destino != zip_path:
+                with zipfile.ZipFile(zip_path, "r") as anterior:
+                    for info in anterior.infolist():
+                        if info.filename not in nuevos:
+                            zf.writestr(info, anterior.read(info))
+            for archivo, nuevo_id in zip(archivos, ids):
+                zf.write(archivo, arcname=f"{nuevo_id}.txt")
+                if detalle:
+                    print(f"{archivo.name}  ->  {nuevo_id}.txt (ZIP)")
+        if destino != zip_path:
+            os.replace(destino, zip_path)
+        conservados = len(set(previos) - nuevos)
+        print(f"\nListo: archivos renombrados directamente en '{Path(zip_path).name}'."
+              + (f" Se conservan {conservados} TXT de ejecuciones anteriores." if conservados else ""))
+        return zip_path
+
+    carpeta_salida.mkdir(exist_ok=True)
+    metodos = {}
+    for archivo, nuevo_id in zip(archivos, ids):
+        nuevo_nombre = carpeta_salida / f"{nuevo_id}.txt"
+        metodo = enlazar_o_copiar(archivo, nuevo_nombre, modo)
+        metodos[metodo] = metodos.get(metodo, 0) + 1
+        if detalle:
+            print(f"{archivo.name}  ->  {nuevo_nombre.name}")
+
+    print(f"\nListo: archivos copiados y renombrados en '{carpeta_salida.name}'.")
+    if modo != "copia":
+        print("Método usado:", ", ".join(f"{m}: {n}" for m, n in sorted(metodos.items())))
+
+    zip_de_carpeta(carpeta_salida, zip_path)
+    return zip_path
+
+# --------- MODO CORPUS: PLAN COMPLETO DESDE ids.csv ---------
+def construir_plan(df):
+    """
+    Recorre ids.csv una sola vez y agrupa las filas por prefijo (en orden).
+    Devuelve {prefijo: {"lote": enclave, "ids": [...], "filas": (inicio, fin_excl)}}.
+    """
+    if COL_PREFIJO not in df.columns:
+        raise ValueError(f"ids.csv no tiene la columna '{COL_PREFIJO}' (COL_PREFIJO) necesaria para MODO_CORPUS.")
+    tiene_lote = COL_LOTE in df.columns
+
+    plan = {}
+    errores = []
+    anterior = None
+    sin_prefijo = 0
+    prefijos = df[COL_PREFIJO].fillna("").astype(str).str.strip()
+    lotes = df[COL_LOTE].fillna("").astype(str).str.strip() if tiene_lote else prefijos
+    for fila, (id_, prefijo, lote) in enumerate(zip(df["id"], prefijos, lotes)):
+        if not prefijo:
+            sin_prefijo += 1
+            anterior = None
+            continue
+        if prefijo not in plan:
+            plan[prefijo] = {"lote": lote, "ids": [], "filas": (fila, fila + 1)}
+        elif prefijo != anterior:
+            errores.append(f"El prefijo {prefijo} aparece en filas no consecutivas (fila {fila}).")
+        elif lote != plan[prefijo]["lote"]:
+            errores.append(f"El prefijo {prefijo} tiene dos enclaves: {plan[prefijo]['lote']} / {lote}.")
+        entrada = plan[prefijo]
+        entrada["ids"].append(id_)
+        entrada["filas"] = (entrada["filas"][0], fila + 1)
+        anterior = prefijo
+
+    if sin_prefijo:
+        print(f"⚠ Filas de ids.csv sin prefijo (se ignoran): {sin_prefijo}")
+    if errores:
+        raise ValueError("ids.csv no es coherente:\n" + "\n".join(errores))
+    return plan
+
+
+def archivos_por_prefijo(carpeta: Path):
+    """
+    Una sola lectura de la carpeta: ({prefijo: [TXT ordenados por sufijo numérico]},
+    [TXT cuyo sufijo no es numérico, p. ej. 11_01_notas.txt, que no se renombran]).
+    """
+    grupos = {}
+    ignorados = []
+    for f in carpeta.iterdir():
+        if f.is_file() and f.suffix.lower() == ".txt" and "_" in f.stem:
+            prefijo, sufijo = f.stem.rsplit("_", 1)
+            if not sufijo.isdigit():
+                ignorados.append(f)
+                continue
+            grupos.setdefault(prefijo, []).append(f)
+    for lista in grupos.values():
+        lista.sort(key=lambda x: int(x.stem.split("_")[-1]))
+    return grupos, sorted(ignorados)
+
+
+def nombre_salida(lote) -> str:
+    """Carpeta/ZIP de salida de un enclave: Ren_<enclave> (espacios y / -> _)."""
+    return "Ren_" + str(lote).replace("/", "_").replace(" ", "_")
+
+
+def ejecutar_plan_corpus(df):
+    plan = construir_plan(df)
+    grupos, ignorados = archivos_por_prefijo(carpeta_origen)
+
+    # 1) Validar TODOS los lotes antes de copiar nada
+    print(f"{'prefijo':<10} {'enclave':<25} {'filas':<13} {'IDs':>5} {'TXT':>5}")
+    errores = []
+    for prefijo, entrada in plan.items():
+        n_txt = len(grupos.get(prefijo, []))
+        ini, fin = entrada["filas"]
+        print(f"{prefijo:<10} {entrada['lote']:<25} {f'{ini}-{fin}':<13} {len(entrada['ids']):>5} {n_txt:>5}")
+        if n_txt != len(entrada["ids"]):
+            errores.append(f"{prefijo} ({entrada['lote']}): {n_txt} TXT para {len(entrada['ids'])} IDs")
+    sin_plan = sorted(set(grupos) - set(plan))
+    if sin_plan:
+        print("\n⚠ Prefijos con TXT pero sin filas en ids.csv (se ignoran):", ", ".join(sin_plan))
+    if ignorados:
+        print("\n⚠ TXT sin sufijo numérico (no se renombran):", ", ".join(f.name for f in ignorados))
+    if errores:
+        raise ValueError("No coincide el número de archivos y de IDs:\n" + "\n".join(errores))
+
+    # 2) Una tarea por carpeta de salida: los prefijos con el mismo enclave (11_01 y 11_02 -> Gijon)
+    #    van al mismo Ren_<enclave>, como al ejecutar el script a mano una vez por prefijo
+    salidas = {}
+    for prefijo, entrada in plan.items():
+        archivos, ids = salidas.setdefault(nombre_salida(entrada["lote"]), ([], []))
+        archivos.extend(grupos[prefijo])
+        ids.extend(entrada["ids"])
+    for nombre in salidas:
+        prefijos = [p for p, e in plan.items() if nombre_salida(e["lote"]) == nombre]
+        if len(prefijos) > 1:
+            print(f"{nombre}: se unen los prefijos {', '.join(prefijos)}")
+
+    def lote(nombre):
+        archivos, ids = salidas[nombre]
+        return empaquetar(archivos, ids, carpeta_salida_base / nombre, MODO_SALIDA, detalle=False)
+
+    with ThreadPoolExecutor(max_workers=N_HILOS) as ex:
+        zips = list(ex.map(lote, salidas))
+    print(f"\nLotes empaquetados: {len(zips)}")
+    return zips
+
+
 if LIMPIAR_TXT_EN_CONTENT:
     for f in glob.glob("/content/*.txt"):
         os.remove(f)
 
 df = pd.read_csv(csv_path)
-ids = df["id"].iloc[fila_inicio:fila_fin_excl].tolist()
-
-print("IDs seleccionados:")
-for i, x in enumerate(ids, start=1):
-    print(i, x)
 
-carpeta_salida.mkdir(exist_ok=True)
-
-archivos = sorted(
-    (
-        f for f in carpeta_origen.iterdir()
-        if f.is_file() and f.suffix.lower() == ".txt" and f.name.startswith(prefijo_archivos)
-    ),
-    key=lambda x: int(x.stem.split("_")[-1])
-)
+if MODO_CORPUS:
+    zips = ejecutar_plan_corpus(df)
+else:
+    ids = df["id"].iloc[fila_inicio:fila_fin_excl].tolist()
 
-print(f"\nArchivos encontrados: {len(archivos)}")
-print(f"IDs seleccionados:    {len(ids)}")
+    print("IDs seleccionados:")
+    for i, x in enumerate(ids, start=1):
+        print(i, x)
 
-if len(archivos) != len(ids):
-    raise ValueError("No coincide el número de archivos y de IDs. Revisa el rango o el prefijo.")
+    archivos = sorted(
+        (
+            f for f in carpeta_origen.iterdir()
+            if f.is_file() and f.suffix.lower() == ".txt" and f.name.startswith(prefijo_archivos)
+        ),
+        key=lambda x: int(x.stem.split("_")[-1])
+    )
 
-for archivo, nuevo_id in zip(archivos, ids):
-    nuevo_nombre = carpeta_salida / f"{nuevo_id}.txt"
-    shutil.copy2(archivo, nuevo_nombre)
-    print(f"{archivo.name}  ->  {nuevo_nombre.name}")
+    print(f"\nArchivos encontrados: {len(archivos)}")
+    print(f"IDs seleccionados:    {len(ids)}")
 
-print(f"\nListo: archivos copiados y renombrados en '{carpeta_salida.name}'.")
+    if len(archivos) != len(ids):
+        raise ValueError("No coincide el número de archivos y de IDs. Revisa el rango o el prefijo.")
 
-zip_base = str(carpeta_salida)
-zip_path = zip_base + ".zip"
-shutil.make_archive(zip_base, "zip", carpeta_salida)
+    zips = [empaquetar(archivos, ids, carpeta_salida, MODO_SALIDA)]
 
-if EN_COLAB:
-    files.download(zip_path)
-else:
-    print("ZIP creado:", zip_path)
+for zip_path in zips:
+    if EN_COLAB:
+        files.download(zip_path)
+    else:
+        print("ZIP creado:", zip_path)
 
@@ -10,7 +10,14 @@
    python 03_verificacion_mapeo_ids.py
 """
 
+import os
+import re
+import sys
+import json
+import hashlib
 from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import unicodedata
 
@@ -30,6 +37,14 @@ BASE_REN_DIR   = Path("Corpus/TXT/Ren")
 CSV_PATH       = Path("Metadatos/Control/ids.csv")
 BASE_ORIGINAL  = Path("Corpus/TXT/Original")
 BASE_REN_ROOT  = Path("Corpus/TXT/Ren")
+USAR_INDICE = False  # True: listar los TXT desde el índice persistente (sin validar aún en Drive; si no está disponible, se recorre la carpeta)
+
+# Validación cruzada: por defecto se compara solo la 1ª línea de cada par Original/Ren.
+# Con VERIFICACION_PROFUNDA se compara el contenido completo normalizado (digest BLAKE2b).
+VERIFICACION_PROFUNDA = False
+N_HILOS_HASH = 8
+CACHE_DIGESTS = Path.home() / ".cache" / "corec" / "digests_verificacion_03.json"
+N_HILOS_ESCANEO = 16  # hilos para recorrer Original y Ren a la vez
 
 # --- COLAB (opcional; solo si estás en Colab) ---
 if EN_COLAB:
@@ -46,6 +61,13 @@ if EN_COLAB:
 # if EN_COLAB:
 #     drive.mount("/content/drive")
 
+# --- Índice persistente de archivos (opcional; Scripts/00_COREC_comun/corec_indice.py) ---
+try:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "00_COREC_comun"))
+    import corec_indice
+except Exception:
+    corec_indice = None
+
 
 # ============================================================
 # Funciones
@@ -61,34 +83,176 @@ def clean_line(line: str) -> str:
     line = unicodedata.normalize("NFKD", line).strip().lower()
     return "".join(c for c in line if not unicodedata.combining(c))
 
+def primera_linea(path: Path) -> str:
+    with path.open(encoding="utf8") as f:
+        return clean_line(f.readline())
+
+def digest_normalizado(path: Path) -> str:
+    """BLAKE2b del contenido completo, línea a línea con clean_line (independiente de espacios y CRLF/LF)."""
+    h = hashlib.blake2b(digest_size=20)
+    with path.open(encoding="utf8") as f:
+        for line in f:
+            h.update(clean_line(line).encode("utf-8"))
+            h.update(b"\n")
+    return h.hexdigest()
+
+# Cambiar si cambia la normalización: invalida los digests guardados
+VERSION_DIGEST = "clean_line-blake2b-1"
+
+def cargar_cache_digests(ruta: Path) -> dict:
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return datos.get("digests", {}) if datos.get("version") == VERSION_DIGEST else {}
+
+def guardar_cache_digests(ruta: Path, cache: dict):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION_DIGEST, "digests": cache}, f)
+    os.replace(tmp, ruta)
+
+def digests_en_paralelo(rutas, cache: dict):
+    """
+    Devuelve ({ruta: digest}, nº calculados). Reutiliza el digest guardado si el
+    archivo conserva tamaño y mtime; el resto se calcula en un pool de hilos.
+    """
+    resultado, pendientes = {}, []
+    for p in set(rutas):
+        st = p.stat()
+        clave = str(p.resolve())
+        guardado = cache.get(clave)
+        if guardado and guardado[:2] == [st.st_size, st.st_mtime_ns]:
+            resultado[p] = guardado[2]
+        else:
+            pendientes.append((p, clave, st))
+
+    with ThreadPoolExecutor(max_workers=N_HILOS_HASH) as ex:
+        for (p, clave, st), d in zip(pendientes, ex.map(digest_normalizado, [x[0] for x in pendientes])):
+            cache[clave] = [st.st_size, st.st_mtime_ns, d]
+            resultado[p] = d
+    return resultado, len(pendientes)
+
 def id_final(path: Path) -> str:
     return path.stem.split("_")[-1][-2:]
 
-def lenguas_dict(path: Path):
-    d = {}
-    for child in path.iterdir():
-        if child.is_dir():
-            first = child.name.split("_")[0]
-            if first.isdigit():
-                d[int(first)] = child
-    return d
+def escanear_carpeta(path: Path):
+    """Una sola pasada de scandir: (subcarpetas, {id_final: TXT}) de `path`."""
+    subdirs, txt = [], {}
+    with os.scandir(path) as it:
+        for e in it:
+            if e.is_dir():
+                subdirs.append(Path(e.path))
+            elif e.name.endswith(".txt"):
+                f = Path(e.path)
+                txt[id_final(f)] = f
+    return subdirs, txt
+
+def escanear_arboles(raices):
+    """
+    Recorre varias raíces (Original y Ren) a la vez en un pool de hilos, nivel a
+    nivel, para solapar la latencia de metadatos de Drive/NFS. Devuelve, por raíz:
+
+        {lengua: {"dir": Path, "txt": {id_final: Path}, "subs": {Path: {id_final: Path}}}}
+    """
+    with ThreadPoolExecutor(max_workers=N_HILOS_ESCANEO) as ex:
+        lenguas_por_raiz = []
+        for subdirs, _ in ex.map(escanear_carpeta, raices):
+            lenguas = {}
+            for d in subdirs:
+                first = d.name.split("_")[0]
+                if first.isdigit():
+                    lenguas[int(first)] = d
+            lenguas_por_raiz.append(lenguas)
+
+        dirs_lengua = [d for lenguas in lenguas_por_raiz for d in lenguas.values()]
+        scan_lengua = dict(zip(dirs_lengua, ex.map(escanear_carpeta, dirs_lengua)))
+
+        dirs_sub = [s for d in dirs_lengua for s in scan_lengua[d][0]]
+        scan_sub = dict(zip(dirs_sub, ex.map(escanear_carpeta, dirs_sub)))
+
+    return [
+        {
+            idx: {
+                "dir": d,
+                "txt": scan_lengua[d][1],
+                "subs": {s: scan_sub[s][1] for s in scan_lengua[d][0]},
+            }
+            for idx, d in lenguas.items()
+        }
+        for lenguas in lenguas_por_raiz
+    ]
 
 def strip_ren(name: str) -> str:
     return name[4:] if name.startswith("Ren_") else name
 
-def emparejar_subcarpeta(sub_o: Path, ren_subs):
-    base = sub_o.name.lower()
-    candidatos = []
-    for d in ren_subs:
-        nombre_r = strip_ren(d.name).lower()
-        if base in nombre_r or nombre_r in base:
-            candidatos.append(d)
-    if not candidatos:
-        return None
+def normalizar_tildes(s: str) -> str:
+    s = unicodedata.normalize("NFD", s.strip())
+    return "".join(ch for ch in s if not unicodedata.combining(ch)).lower()
+
+def tokens_nombre(name: str) -> frozenset:
+    """Palabras de un nombre de carpeta (sin tildes, en minúsculas; separadores: espacio, _ y -)."""
+    return frozenset(t for t in re.split(r"[\s_\-]+", normalizar_tildes(name)) if t)
+
+class IndiceSubcarpetas:
+    """
+    Índice de las subcarpetas Ren de una lengua para emparejarlas con las de Original.
+
+    1) clave exacta: normalizar(strip_ren(nombre))
+    2) palabras: el nombre Original contiene todas las palabras del Ren, o al revés
+    3) compatibilidad: inclusión de subcadenas (criterio anterior)
+
+    La clave exacta tiene prioridad: "Lleida" se empareja con Ren_Lleida aunque exista
+    Ren_Lleida Centro (el criterio anterior elegía el candidato de nombre más largo).
+    El paso 3 recorre todas las subcarpetas, pero solo se llega a él con los nombres
+    que no casan por clave ni por palabras (pocos, dentro de una lengua).
+    """
+    def __init__(self, ren_subs):
+        self.ren_subs = list(ren_subs)
+        self.por_clave = {}
+        self.por_token = {}
+        self.n_tokens = {}
+        for d in self.ren_subs:
+            nombre = strip_ren(d.name)
+            self.por_clave.setdefault(normalizar(nombre), []).append(d)
+            toks = tokens_nombre(nombre)
+            self.n_tokens[d] = len(toks)
+            for t in toks:
+                self.por_token.setdefault(t, []).append(d)
+
+    def candidatos(self, sub_o: Path) -> list:
+        exactos = self.por_clave.get(normalizar(sub_o.name))
+        if exactos:
+            return exactos
+
+        toks = tokens_nombre(sub_o.name)
+        comunes = Counter(d for t in toks for d in self.por_token.get(t, ()))
+        por_tokens = [
+            d for d, n in comunes.items()
+            if n == len(toks) or n == self.n_tokens[d]
+        ]
+        if por_tokens:
+            return por_tokens
+
+        base = sub_o.name.lower()
+        return [
+            d for d in self.ren_subs
+            if base in strip_ren(d.name).lower() or strip_ren(d.name).lower() in base
+        ]
+
+def emparejar_subcarpeta(sub_o: Path, indice: IndiceSubcarpetas):
+    """
+    Devuelve (subcarpeta Ren, candidatos). Si hay varios candidatos el emparejamiento
+    es ambiguo: se devuelve None y los candidatos (de nombre más largo a más corto),
+    y la subcarpeta no se verifica contra ninguno.
+    """
+    candidatos = indice.candidatos(sub_o)
     if len(candidatos) == 1:
-        return candidatos[0]
-    candidatos.sort(key=lambda d: len(strip_ren(d.name)), reverse=True)
-    return candidatos[0]
+        return candidatos[0], candidatos
+    candidatos = sorted(candidatos, key=lambda d: len(strip_ren(d.name)), reverse=True)
+    return None, candidatos
 
 
 # ============================================================
@@ -105,60 +269,63 @@ else:
     df["id"] = df["id"].astype(str).str.strip()
     df["Parte del nombre"] = df["Parte del nombre"].astype(str).str.strip()
 
-    id_to_paths = {}
-    for f in BASE_REN_DIR.rglob("*.txt"):
-        stem = f.stem.strip()
-        rel_path = f.relative_to(BASE_REN_DIR)
-        id_to_paths.setdefault(stem, []).append(str(rel_path))
-
-    resultados = []
-    for _, row in df.iterrows():
-        id_ = row["id"]
-        parte = row["Parte del nombre"]
-        paths = id_to_paths.get(id_, [])
-
-        if not paths:
-            resultados.append((id_, parte, "", "SIN_ARCHIVO"))
-            continue
-
-        parte_norm = normalizar(parte)
-        estados_paths = []
-
-        for r in paths:
-            ruta_norm = normalizar(r)
-            if parte_norm and parte_norm in ruta_norm:
-                estados_paths.append((r, "OK_EN_ESTA_CARPETA"))
-            else:
-                estados_paths.append((r, "CARPETA_INCORRECTA"))
-
-        if any(e == "OK_EN_ESTA_CARPETA" for _, e in estados_paths):
-            if sum(1 for _, e in estados_paths if e == "OK_EN_ESTA_CARPETA") > 1:
-                estado_global = "DUPLICADO_EN_VARIAS_CARPETAS_CORRECTAS"
-            else:
-                estado_global = "OK"
-        else:
-            estado_global = "EN_CARPETA_INCORRECTA"
-
-        rutas_str = " | ".join(f"{r} [{e}]" for r, e in estados_paths)
-        resultados.append((id_, parte, rutas_str, estado_global))
+    # Un TXT por fila (en el orden del listado); un mismo ID puede aparecer en varias carpetas
+    if USAR_INDICE and corec_indice is not None:
+        rutas_rel = corec_indice.listar_txt(BASE_REN_DIR, relativas=True)
+    else:
+        rutas_rel = [str(f.relative_to(BASE_REN_DIR)) for f in BASE_REN_DIR.rglob("*.txt")]
+    fs = pd.DataFrame([(Path(r).stem.strip(), r) for r in rutas_rel], columns=["id", "ruta"])
+    fs["orden"] = range(len(fs))
+
+    # Claves normalizadas: normalizar() se llama una vez por valor distinto de cada columna
+    partes = df["Parte del nombre"].unique()
+    df["parte_norm"] = df["Parte del nombre"].map({p: normalizar(p) if isinstance(p, str) else "" for p in partes})
+    fs["ruta_norm"] = fs["ruta"].map(normalizar)
+
+    # Una sola unión externa CSV x REN:
+    #   both -> ID con archivo(s), left_only -> faltantes (SIN_ARCHIVO), right_only -> sobrantes
+    cruce = (
+        df[["id", "Parte del nombre", "parte_norm"]]
+        .rename_axis("fila").reset_index()
+        .merge(fs, on="id", how="outer", indicator=True)
+    )
 
-    res_df = pd.DataFrame(
-        resultados,
-        columns=["id", "Parte del nombre", "rutas_encontradas", "estado"]
+    # Una fila por (fila del CSV, ruta), en el orden del CSV y, dentro de cada ID, en el del listado
+    pares = cruce[cruce["_merge"] != "right_only"].sort_values(["fila", "orden"], kind="stable")
+    pares = pares.astype({"fila": int})
+    pares["ok"] = [
+        bool(p) and isinstance(r, str) and p in r
+        for p, r in zip(pares["parte_norm"], pares["ruta_norm"])
+    ]
+    pares["ruta_estado"] = (
+        pares["ruta"] + " [" + pares["ok"].map({True: "OK_EN_ESTA_CARPETA", False: "CARPETA_INCORRECTA"}) + "]"
     )
 
+    por_fila = pares.groupby("fila", sort=True)
+    res_df = pd.DataFrame({
+        "id": por_fila["id"].first(),
+        "Parte del nombre": por_fila["Parte del nombre"].first(),
+        "rutas_encontradas": por_fila["ruta_estado"].agg(lambda s: " | ".join(s.dropna())),
+        "n_rutas": por_fila["ruta"].count(),
+        "n_ok": por_fila["ok"].sum(),
+    }).reset_index(drop=True)
+
+    estado = pd.Series("EN_CARPETA_INCORRECTA", index=res_df.index)
+    estado = estado.mask(res_df["n_ok"] == 1, "OK")
+    estado = estado.mask(res_df["n_ok"] > 1, "DUPLICADO_EN_VARIAS_CARPETAS_CORRECTAS")
+    estado = estado.mask(res_df["n_rutas"] == 0, "SIN_ARCHIVO")
+    res_df["estado"] = estado
+    res_df = res_df[["id", "Parte del nombre", "rutas_encontradas", "estado"]]
+
     print("\nRESUMEN DE ESTADOS:")
     print(res_df["estado"].value_counts())
 
     print("\nEjemplos con problema:")
     print(res_df[res_df["estado"] != "OK"].head(20))
 
-    # SOBRANTES / FALTANTES (idéntico)
-    ids_fs = set(id_to_paths.keys())
-    ids_csv = set(df["id"])
-
-    sobran = sorted(ids_fs - ids_csv)
-    faltan = sorted(ids_csv - ids_fs)
+    # SOBRANTES / FALTANTES (de la misma unión)
+    sobran = sorted(cruce.loc[cruce["_merge"] == "right_only", "id"].unique())
+    faltan = sorted(cruce.loc[cruce["_merge"] == "left_only", "id"].unique())
 
     print("\n===== ARCHIVOS SOBRANTES (no están en el CSV) =====")
     if sobran:
@@ -183,44 +350,59 @@ print(f"\n--- INICIO: Validación Cruzada (Estructura y Contenido) ---")
 if (not BASE_ORIGINAL.exists()) or (not BASE_REN_ROOT.exists()):
     print("⚠ Saltando validación cruzada: Rutas Original/Ren no encontradas/incorrectas.")
 else:
-    orig_langs = lenguas_dict(BASE_ORIGINAL)
-    ren_langs  = lenguas_dict(BASE_REN_ROOT)
+    # Estructura en memoria de ambos árboles: lengua -> subcarpeta -> id_final -> ruta
+    orig_langs, ren_langs = escanear_arboles([BASE_ORIGINAL, BASE_REN_ROOT])
 
     mismatches = []
+    pares = []  # (lengua, subcarpeta, ID, archivo Original, archivo Ren), solo en VERIFICACION_PROFUNDA
 
     for idx in sorted(set(orig_langs.keys()) | set(ren_langs.keys())):
-        orig_lang = orig_langs.get(idx)
-        ren_lang  = ren_langs.get(idx)
+        orig = orig_langs.get(idx)
+        ren  = ren_langs.get(idx)
 
-        if orig_lang is None:
-            mismatches.append((f"Lengua {idx}", "Sólo en REN", ren_lang.name))
+        if orig is None:
+            mismatches.append((f"Lengua {idx}", "Sólo en REN", ren["dir"].name))
             continue
-        if ren_lang is None:
-            mismatches.append((orig_lang.name, "Sólo en ORIGINAL (no hay carpeta en REN)"))
+        if ren is None:
+            mismatches.append((orig["dir"].name, "Sólo en ORIGINAL (no hay carpeta en REN)"))
             continue
 
-        orig_subs = [d for d in orig_lang.iterdir() if d.is_dir()]
-        ren_subs  = [d for d in ren_lang.iterdir() if d.is_dir()]
+        orig_lang = orig["dir"]
+        txt_o = orig["subs"]
+        txt_r = ren["subs"]
+
+        if not txt_o and not txt_r:
+            txt_o = {orig_lang: orig["txt"]}
+            txt_r = {ren["dir"]: ren["txt"]}
 
-        if not orig_subs and not ren_subs:
-            orig_subs = [orig_lang]
-            ren_subs  = [ren_lang]
+        orig_subs = list(txt_o)
+        ren_subs  = list(txt_r)
+
+        indice_ren = IndiceSubcarpetas(ren_subs)
 
         for sub_o in orig_subs:
-            sub_r = emparejar_subcarpeta(sub_o, ren_subs)
+            sub_r, candidatos = emparejar_subcarpeta(sub_o, indice_ren)
 
-            if sub_r is None:
+            if not candidatos:
                 mismatches.append((
                     orig_lang.name,
                     f"Subcarpeta de ORIGINAL sin par en REN (por nombre parcial): {sub_o.name}"
                 ))
                 continue
+            if sub_r is None:
+                # con varios candidatos no se compara: los errores se medirían contra
+                # una carpeta que puede no ser la suya
+                mismatches.append((
+                    orig_lang.name,
+                    sub_o.name,
+                    "Emparejamiento ambiguo con REN: "
+                    + ", ".join(d.name for d in candidatos)
+                    + " (subcarpeta sin verificar)"
+                ))
+                continue
 
-            orig_files = list(sub_o.glob("*.txt"))
-            ren_files  = list(sub_r.glob("*.txt"))
-
-            ids_o = {id_final(f): f for f in orig_files}
-            ids_r = {id_final(f): f for f in ren_files}
+            ids_o = txt_o[sub_o]
+            ids_r = txt_r[sub_r]
 
             ids_orig = set(ids_o.keys())
             ids_ren  = set(ids_r.keys())
@@ -240,15 +422,30 @@ else:
                 fo = ids_o[ID]
                 fr = ids_r[ID]
 
-                lo = clean_line(fo.open(encoding="utf8").readline())
-                lr = clean_line(fr.open(encoding="utf8").readline())
-
-                if lo != lr:
+                if VERIFICACION_PROFUNDA:
+                    # se comparan después, con todos los digests calculados en paralelo
+                    pares.append((orig_lang.name, sub_o.name, ID, fo, fr))
+                elif primera_linea(fo) != primera_linea(fr):
                     mismatches.append((
                         orig_lang.name, sub_o.name, fo.name, fr.name,
                         f"Primera línea distinta para ID {ID}"
                     ))
 
+    if VERIFICACION_PROFUNDA:
+        cache = cargar_cache_digests(CACHE_DIGESTS)
+        digests, calculados = digests_en_paralelo(
+            [f for *_, fo, fr in pares for f in (fo, fr)], cache
+        )
+        guardar_cache_digests(CACHE_DIGESTS, cache)
+        print(f"Digests: {len(digests)} archivos ({calculados} calculados, {len(digests) - calculados} de caché)")
+
+        for lengua, sub, ID, fo, fr in pares:
+            if digests[fo] != digests[fr]:
+                mismatches.append((
+                    lengua, sub, fo.name, fr.name,
+                    f"Contenido distinto (normalizado) para ID {ID}"
+                ))
+
     print("\n===================== RESULTADO FINAL =====================\n")
 
     if mismatches:
@@ -256,4 +453,5 @@ else:
         for m in mismatches:
             print(m)
     else:
-        print("TODO CORRECTO: Coincidencia 1:1 PERFECTA por lengua, subcarpeta, ID y contenido (1ª línea).")
+        alcance = "contenido completo" if VERIFICACION_PROFUNDA else "contenido (1ª línea)"
+        print(f"TODO CORRECTO: Coincidencia 1:1 PERFECTA por lengua, subcarpeta, ID y {alcance}.")
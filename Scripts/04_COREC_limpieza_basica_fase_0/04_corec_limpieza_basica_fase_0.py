@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
-import os, re
+import os, re, sys, time, json, hashlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 """
 1) Edita CONFIG si ejecutas en local
 """
@@ -17,18 +19,31 @@ except Exception:
 # --- LOCAL (por defecto; ejecutando desde la raíz del repo COREC) ---
 ROOT_IN  = "Corpus/TXT/Ren"
 ROOT_OUT = "Corpus/TXT/Ren_limpio_fase_0"
+USAR_INDICE = False  # True: listar los TXT desde el índice persistente (sin validar aún en Drive; si no está disponible, se recorre la carpeta)
+N_WORKERS = 1       # nº de procesos para limpiar TXT en paralelo (1 = secuencial, como siempre)
+INCREMENTAL = True  # no vuelve a limpiar los TXT sin cambios (mismo contenido y mismas reglas)
 
 # --- COLAB (opcional; carpeta COREC subida a MyDrive) ---
 if EN_COLAB:
     REPO_ROOT = "/content/drive/MyDrive/COREC"
     ROOT_IN  = f"{REPO_ROOT}/Corpus/TXT/Ren"
     ROOT_OUT = f"{REPO_ROOT}/Corpus/TXT/Ren_limpio_fase_0_test"
+
+# Manifiesto: huella de cada TXT de entrada, versión de las reglas y huella de la salida
+MANIFEST_PATH = os.path.join(ROOT_OUT, "_manifest_fase_0.json")
 # =========================
 
 # --- Si quieres montar Drive en Colab, descomenta ---
 # if EN_COLAB:
 #     drive.mount("/content/drive")
 
+# --- Índice persistente de archivos (opcional; Scripts/00_COREC_comun/corec_indice.py) ---
+try:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "00_COREC_comun"))
+    import corec_indice
+except Exception:
+    corec_indice = None
+
 
 # --------- PATRONES -------
 
@@ -55,29 +70,98 @@ ONLY_DIGITS  = re.compile(r'^\s*\d+\s*$')
 REMOVE_COREC = re.compile(r'corec', re.IGNORECASE)
 
 # --------- NO TOCAR CORCHETES / ANGULARES / LLAVES / PARÉNTESIS ---------
-def clean_outside_brackets(text):
-    # protegemos [ ], < >, { }, ( )
-    parts = re.split(r'(\[[^\]]*\]|<[^>]*>|\{[^}]*\}|\([^)]*\))', text)
+# Un solo recorrido por línea: el motor de regex salta el texto normal y solo se
+# detiene en marcas protegidas [ ] < > { } ( ), espacios/tabuladores a colapsar,
+# puntuación fuerte y barras (con el hueco que las sigue). El resultado es idéntico
+# al de aplicar por fragmento las 6 sustituciones de la versión anterior:
+#   [ \t]+ -> " " | (\.{3}|[.!?:;])(?=\S) -> "\1 " | ([^\s/])// -> "\1 //"
+#   ([^\s/])/(?!/) -> "\1 /" | //\s*([^\s]) -> "// \1" | /\s*([^\s/]) -> "/ \1"
+SCANNER = re.compile(
+    r'(?P<prot>\[[^\]]*\]|<[^>]*>|\{[^}]*\}|\([^)]*\))'
+    r'|(?P<esp>[ \t]{2,}|\t)'
+    r'|(?P<punt>[.!?:;]+)'
+    r'|(?P<barras>/+)(?P<hueco>\s*)'
+)
+PROTEGIDO = re.compile(r'\[[^\]]*\]|<[^>]*>|\{[^}]*\}|\([^)]*\)')
+ESP_TAB   = re.compile(r'[ \t]+')
+PUNT      = ".!?:;"
+
+def _puntuacion(run, sigue_no_espacio):
+    # espacio tras "..." o tras cada signo si le sigue algo que no sea espacio
+    if len(run) == 1:
+        return run + " " if sigue_no_espacio else run
     out = []
-    for i, p in enumerate(parts):
-        if i % 2 == 1:  # dentro de marca protegida
-            out.append(p)
-        else:
-            # espacios múltiples -> 1
-            p = re.sub(r'[ \t]+', ' ', p)
-            # espacio tras puntuación fuerte si falta
-            p = re.sub(r'(\.{3}|[.!?:;])(?=\S)', r'\1 ', p)
+    i, n = 0, len(run)
+    while i < n:
+        if run.startswith("...", i) and (i + 3 < n or sigue_no_espacio):
+            out.append("... ")
+            i += 3
+            continue
+        out.append(run[i] + " " if (i + 1 < n or sigue_no_espacio) else run[i])
+        i += 1
+    return "".join(out)
 
-            # ----  espacio ANTES de / y // si están pegados a palabra ----
-            p = re.sub(r'([^\s/])//', r'\1 //', p)       # ...palabra// -> palabra //
-            p = re.sub(r'([^\s/])/(?!/)', r'\1 /', p)    # ...palabra/  -> palabra /
+def clean_outside_brackets(text):
+    n = len(text)
+    fin_prot = 0          # fin de la última marca protegida (= inicio del fragmento actual)
+    consumida = False     # la 1ª barra de esta secuencia ya cerró un "//" anterior
 
-            # ---- espacio DESPUÉS de / y // ----
-            p = re.sub(r'//\s*([^\s])', r'// \1', p)     # //palabra -> // palabra
-            p = re.sub(r'/\s*([^\s/])', r'/ \1', p)      # /palabra  -> / palabra
+    def siguiente(pos):
+        # carácter siguiente dentro del fragmento (None si acaba o empieza una marca)
+        if pos >= n or PROTEGIDO.match(text, pos):
+            return None
+        return text[pos]
 
-            out.append(p)
-    return ''.join(out)
+    def sustituir(m):
+        nonlocal fin_prot, consumida
+        tipo = m.lastgroup
+        if tipo == "prot":
+            fin_prot = m.end()
+            consumida = False
+            return m.group()
+        if tipo == "esp":
+            return " "
+        if tipo == "punt":
+            c = siguiente(m.end())
+            return _puntuacion(m.group(), c is not None and not c.isspace())
+
+        barras, hueco = m.group("barras"), m.group("hueco")
+
+        # ----  espacio ANTES de / y // si están pegados a palabra ----
+        antes = ""
+        if m.start() > fin_prot:
+            c = text[m.start() - 1]
+            if not c.isspace() and c not in PUNT:   # tras puntuación ya hay espacio
+                antes = " "
+
+        # ---- espacio DESPUÉS de / y // ----
+        # los "//" se emparejan de izquierda a derecha; tras la 2ª barra de cada par
+        # va un espacio, y la barra que le sigue ya no puede abrir otro par
+        sig = siguiente(m.end())
+        nb = len(barras)
+        a = 1 if consumida else 0
+        consumida = False
+        ultima_par = False
+        partes, inicio = [], 0
+        while a + 1 < nb:
+            s = a + 1
+            if s < nb - 1:
+                partes.append(barras[inicio:s + 1])
+                inicio = s + 1
+                a = s + 2
+            else:
+                ultima_par = sig is not None
+                break
+        partes.append(barras[inicio:])
+
+        if ultima_par or (sig is not None and sig != "/"):
+            despues = " "
+            consumida = ultima_par and sig == "/"
+        else:
+            despues = ESP_TAB.sub(" ", hueco)
+        return antes + " ".join(partes) + despues
+
+    return SCANNER.sub(sustituir, text)
 
 # --------- LIMPIEZA DE UNA LÍNEA ---------
 def clean_line(line):
@@ -96,79 +180,263 @@ def clean_line(line):
         return body + ("\n" if body else "")
 
 # --------- PROCESAR UN TXT ---------
-def process_file(path_in, path_out):
-    with open(path_in, "r", encoding="utf-8", errors="ignore") as f:
-        lines = f.readlines()
+# Los pasos 1-4 son generadores encadenados: cada línea pasa por todos ellos sin
+# listas intermedias, y en memoria solo queda la intervención en curso.
 
+def _filtrar(lines, cuenta):
     # 1. quitar líneas solo números y líneas con "COREC" que no sean turnos
-    filtered = []
     for ln in lines:
+        cuenta[0] += 1
         if ONLY_DIGITS.match(ln):
             continue
         if REMOVE_COREC.search(ln) and not TAG_TURN.match(ln):
             continue
-        filtered.append(ln)
-    lines = filtered
+        yield ln
 
+def _unir_etiqueta_sola(lines):
     # 2. Unir etiqueta sola + línea siguiente
-    merged = []
-    i = 0
-    while i < len(lines):
-        ln = lines[i]
-        if TAG_ONLY.match(ln) and i+1 < len(lines) and not TAG_TURN.match(lines[i+1]):
-            tag = TAG_ONLY.match(ln).group(1)
-            merged.append(f"{tag}: {lines[i+1].lstrip()}")
-            i += 2
+    it = iter(lines)
+    ln = next(it, None)
+    while ln is not None:
+        sig = next(it, None)
+        m = TAG_ONLY.match(ln)
+        if m and sig is not None and not TAG_TURN.match(sig):
+            yield f"{m.group(1)}: {sig.lstrip()}"
+            ln = next(it, None)
             continue
-        merged.append(ln)
-        i += 1
+        yield ln
+        ln = sig
 
+def _limpiar(lines):
     # 3. Limpieza y quitar vacías internas
-    cleaned = []
-    for ln in merged:
+    for ln in lines:
         out = clean_line(ln)
         if out.strip():
-            cleaned.append(out)
+            yield out
 
+def _intervenciones(lines):
     # 4. Unir TODAS las líneas de una misma intervención
-    #    (desde un turno hasta el siguiente turno)
-    joined = []
-    for ln in cleaned:
+    #    (desde un turno hasta el siguiente turno); las piezas se unen una sola vez
+    piezas = []
+    for ln in lines:
         text = ln.rstrip()
-        if TAG_TURN.match(text):        # nueva intervención
-            joined.append(text)
-        else:                           # continuación del turno anterior
-            if joined:
-                joined[-1] = joined[-1].rstrip() + " " + text
-            else:
-                joined.append(text)
-
-    # 5. Insertar 1 línea vacía entre intervenciones
-    final = []
-    for idx, text in enumerate(joined):
-        if idx > 0:
-            final.append("\n")
-        final.append(text + "\n")
+        if TAG_TURN.match(text) and piezas:    # nueva intervención
+            yield " ".join(piezas)
+            piezas = []
+        piezas.append(text)                    # o continuación del turno anterior
+    if piezas:
+        yield " ".join(piezas)
 
-    # Guardar
+def process_file(path_in, path_out):
     os.makedirs(os.path.dirname(path_out), exist_ok=True)
-    with open(path_out, "w", encoding="utf-8") as f:
-        f.writelines(final)
+    parcial = path_out + ".parcial"
+    cuenta = [0]
+    n_turnos = 0
+    with open(path_in, "r", encoding="utf-8", errors="ignore") as f_in, \
+         open(parcial, "w", encoding="utf-8") as f_out:
+        for text in _intervenciones(_limpiar(_unir_etiqueta_sola(_filtrar(f_in, cuenta)))):
+            # 5. Insertar 1 línea vacía entre intervenciones
+            if n_turnos:
+                f_out.write("\n")
+            f_out.write(text + "\n")
+            n_turnos += 1
+    # Guardar (el TXT anterior solo se sustituye si el archivo se ha procesado entero)
+    os.replace(parcial, path_out)
+    return cuenta[0], n_turnos
+
+# --------- MANIFIESTO (entrada -> salida, por versión de reglas) ---------
+# Subir a mano si cambia la lógica de limpieza sin cambiar ningún patrón
+REVISION_REGLAS = 1
+
+def version_reglas():
+    """Huella de las reglas: patrones compilados (y sus flags) + revisión manual."""
+    h = hashlib.sha256(str(REVISION_REGLAS).encode())
+    for patron in (TAG_TURN, TAG_ONLY, ONLY_DIGITS, REMOVE_COREC, SCANNER, PROTEGIDO, ESP_TAB):
+        h.update(f"\x00{patron.pattern}\x00{patron.flags}".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def sha256_archivo(ruta, bloque=1 << 20):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+def cargar_manifest(ruta):
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f).get("archivos", {})
+    except (OSError, ValueError):
+        print("⚠ Manifiesto ilegible: se limpia todo.")
+        return {}
+
+def guardar_manifest(ruta, archivos):
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "archivos": archivos}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, ruta)
+
+def huella(ruta):
+    st = os.stat(ruta)
+    return st.st_size, st.st_mtime_ns
+
+def registro_manifest(src, dst, reglas, sha_in=None, sha_out=None):
+    """Entrada del manifiesto: SHA-256, tamaño y mtime de la entrada y de la salida."""
+    tam_in, mtime_in = huella(src)
+    tam_out, mtime_out = huella(dst)
+    return {
+        "sha256_entrada": sha_in or sha256_archivo(src),
+        "tamano_entrada": tam_in,
+        "mtime_entrada": mtime_in,
+        "reglas": reglas,
+        "sha256_salida": sha_out or sha256_archivo(dst),
+        "tamano_salida": tam_out,
+        "mtime_salida": mtime_out,
+    }
+
+def salida_reutilizable(entrada, src, reglas, dst):
+    """
+    La salida vale si procede del mismo TXT, con las mismas reglas, y no se ha tocado.
+    Primero se comparan tamaño y mtime con el manifiesto; solo se calcula el SHA-256 del
+    archivo (entrada o salida) cuyo tamaño o mtime ha cambiado.
+    Devuelve la entrada del manifiesto actualizada, o None si hay que volver a limpiar.
+    """
+    if not entrada or entrada.get("error") or entrada.get("reglas") != reglas:
+        return None
+    if not os.path.exists(dst):
+        return None
+    sha = {}
+    sin_tocar = True
+    for lado, ruta in (("entrada", src), ("salida", dst)):
+        if huella(ruta) == (entrada.get("tamano_" + lado), entrada.get("mtime_" + lado)):
+            sha[lado] = entrada["sha256_" + lado]
+            continue
+        sin_tocar = False
+        sha[lado] = sha256_archivo(ruta)
+        if sha[lado] != entrada.get("sha256_" + lado):
+            return None
+    if sin_tocar:
+        return entrada
+    # mismo contenido con otro tamaño/mtime registrado (copiado, tocado, manifiesto antiguo...)
+    return registro_manifest(src, dst, reglas, sha["entrada"], sha["salida"])
 
 # --------- RECORRER TODAS LAS SUBCARPETAS ---------
-total_txt = 0
+def listar_txt(root: str) -> list:
+    """TXT bajo root (recursivo): desde el índice persistente si está disponible, si no con os.walk."""
+    if USAR_INDICE and corec_indice is not None:
+        return corec_indice.listar_txt(root, ignorar_mayusculas=True)
+    return [
+        os.path.join(dp, name)
+        for dp, _, files in os.walk(root)
+        for name in files
+        if name.lower().endswith(".txt")
+    ]
+
+def tareas_limpieza(manifest, reglas):
+    """
+    (origen, destino, clave, entrada del manifiesto, reglas) de cada TXT, en orden
+    de ruta: la salida no depende del orden de ejecución.
+    """
+    tareas = []
+    for src in sorted(listar_txt(ROOT_IN)):
+        rel = os.path.relpath(os.path.dirname(src), ROOT_IN)
+        out_dir = os.path.join(ROOT_OUT, rel) if rel != "." else ROOT_OUT
+        clave = os.path.relpath(src, ROOT_IN).replace(os.sep, "/")
+        entrada = manifest.get(clave) if INCREMENTAL else None
+        tareas.append((src, os.path.join(out_dir, os.path.basename(src)), clave, entrada, reglas))
+    return tareas
+
+def limpiar(tarea):
+    src, dst, _, entrada, reglas = tarea
+    try:
+        registro = salida_reutilizable(entrada, src, reglas, dst)
+        if registro is not None:
+            return src, "SIN_CAMBIOS", "", 0, 0, registro
+        n_lineas, n_turnos = process_file(src, dst)
+        return src, "OK", "", n_lineas, n_turnos, registro_manifest(src, dst, reglas)
+    except Exception as e:
+        return src, "ERROR", f"{type(e).__name__}: {e}", 0, 0, None
+
+def eliminar_huerfanos(manifest, claves_actuales):
+    """
+    Borra las salidas registradas cuyo TXT de entrada ya no existe y devuelve
+    (borrados, conservados). Solo se borra si la carpeta del TXT de entrada sigue
+    existiendo: si falta la carpeta entera (renombrada, Drive sin montar...) la
+    salida y su entrada del manifiesto se conservan.
+    """
+    borrados, conservados = [], []
+    for clave in sorted(set(manifest) - claves_actuales):
+        carpeta_in = os.path.join(ROOT_IN, *clave.split("/")[:-1])
+        if not os.path.isdir(carpeta_in):
+            conservados.append(clave)
+            continue
+        dst = os.path.join(ROOT_OUT, *clave.split("/"))
+        if os.path.exists(dst):
+            os.remove(dst)
+        borrados.append(clave)
+        del manifest[clave]
+    return borrados, conservados
+
+def main():
+    if not os.path.isdir(ROOT_IN):
+        print(f"ERROR: no existe la carpeta de entrada {ROOT_IN}. Edita CONFIG (o monta Drive).")
+        return
+    reglas = version_reglas()
+    manifest = cargar_manifest(MANIFEST_PATH)
+    tareas = tareas_limpieza(manifest, reglas)
+    t0 = time.perf_counter()
+    if N_WORKERS > 1 and len(tareas) > 1:
+        # sin una línea por archivo: solo el resumen final
+        print(f"Limpiando {len(tareas)} TXT con {N_WORKERS} procesos...")
+        chunksize = max(1, len(tareas) // (N_WORKERS * 8))
+        with ProcessPoolExecutor(max_workers=N_WORKERS) as ex:
+            resultados = list(ex.map(limpiar, tareas, chunksize=chunksize))
+    else:
+        resultados = []
+        for tarea in tareas:
+            res = limpiar(tarea)
+            if res[1] != "SIN_CAMBIOS":
+                print("→ limpiando:", tarea[0])
+            resultados.append(res)
+    segundos = time.perf_counter() - t0
 
-for dp, _, files in os.walk(ROOT_IN):
-    rel = os.path.relpath(dp, ROOT_IN)
-    out_dir = os.path.join(ROOT_OUT, rel) if rel != "." else ROOT_OUT
-    for name in files:
-        if name.lower().endswith(".txt"):
-            src = os.path.join(dp, name)
-            dst = os.path.join(out_dir, name)
-            print("→ limpiando:", src)
-            process_file(src, dst)
-            total_txt += 1
+    # Actualizar el manifiesto. Los errores conservan la entrada anterior marcada con "error":
+    # se reintentan en la siguiente ejecución y su salida sigue registrada (huérfanos)
+    for (_, _, clave, _, _), (_, estado, _, _, _, registro) in zip(tareas, resultados):
+        if estado == "ERROR":
+            manifest[clave] = {**manifest.get(clave, {}), "error": True}
+        else:
+            manifest[clave] = registro
+    if tareas:
+        borrados, conservados = eliminar_huerfanos(manifest, {t[2] for t in tareas})
+    else:
+        # sin ningún TXT de entrada no se borra nada: es más probable un error de ruta
+        borrados, conservados = [], sorted(manifest)
+    guardar_manifest(MANIFEST_PATH, manifest)
 
-print(f"Limpieza finalizada (FASE 0). Archivos procesados: {total_txt}")
+    errores = [r for r in resultados if r[1] == "ERROR"]
+    sin_cambios = sum(1 for r in resultados if r[1] == "SIN_CAMBIOS")
+    total_txt = len(resultados) - len(errores) - sin_cambios
+    lineas = sum(r[3] for r in resultados)
+    turnos = sum(r[4] for r in resultados)
+    print(f"Limpieza finalizada (FASE 0). Archivos procesados: {total_txt}")
+    print(f"  sin cambios (se conserva la salida): {sin_cambios} | "
+          f"salidas eliminadas (origen borrado): {len(borrados)} | reglas: {reglas}")
+    print(f"  líneas leídas: {lineas} | intervenciones escritas: {turnos} | "
+          f"{segundos:.1f} s ({len(resultados) / max(segundos, 1e-9):.1f} archivos/s)")
+    for clave in borrados:
+        print(f"  🗑 {clave}")
+    if conservados:
+        print(f"  ⚠ {len(conservados)} salidas sin TXT de entrada se conservan "
+              f"(no hay TXT en {ROOT_IN} o falta su carpeta)")
+    if errores:
+        print(f"  con error: {len(errores)}")
+        for src, _, detalle, *_ in errores:
+            print(f"  ❌ {src}: {detalle}")
 
 
+if __name__ == "__main__":
+    main()
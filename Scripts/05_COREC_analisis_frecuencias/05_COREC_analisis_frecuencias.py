@@ -9,8 +9,13 @@
    python 05_COREC_analisis_frecuencias.py
 """
 
-import os, re, csv
-from collections import Counter
+import os, re, csv, sys, time
+import importlib.util
+from pathlib import Path
+import math
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 # --- Colab opcional ---
 try:
@@ -26,17 +31,47 @@ except Exception:
 # --- LOCAL (por defecto; ejecutando desde la raíz del repo COREC) ---
 ROOT_IN = "Corpus/TXT/Ren_limpio_fase_0"
 CSV_OUT = "Frecuencias_basicas/analisis_de_frecuencias_def.csv"
+USAR_INDICE = False  # True: listar los TXT desde el índice persistente (sin validar aún en Drive; si no está disponible, se recorre la carpeta)
+USAR_TOKENIZADO = True  # leer del formato tokenizado común (se construye la 1.ª vez); si no está disponible, se leen los TXT
+N_WORKERS = 1       # nº de procesos para analizar TXT en paralelo (1 = secuencial, como siempre)
+
+# Tablas de frecuencias por forma (lengua x rol INF/ENT, y global) en Parquet; necesita pandas + pyarrow
+TABLAS_FRECUENCIAS = False
+FREQ_OUT = "Frecuencias_basicas/frecuencias_por_lengua_y_rol.parquet"
+
+# Copia tipada del CSV en Parquet (identificadores sin apóstrofo, columnas numéricas), para 06 y cuadernos;
+# necesita pandas + pyarrow (si faltan, solo se escribe el CSV)
+TABLA_PARQUET = True
+PARQUET_OUT = "Frecuencias_basicas/analisis_de_frecuencias_def.parquet"
+
+# Riqueza léxica: ventana (en tokens) del TTR medio móvil (MATTR)
+VENTANA_MATTR = 100
 
 # --- COLAB (opcional; carpeta COREC subida a MyDrive) ---
 if EN_COLAB:
     REPO_ROOT = "/content/drive/MyDrive/COREC"
     ROOT_IN = f"{REPO_ROOT}/Corpus/TXT/Ren_limpio_fase_0"
     CSV_OUT = f"{REPO_ROOT}/Frecuencias_basicas/analisis_de_frecuencias_def_test.csv"
+    FREQ_OUT = f"{REPO_ROOT}/Frecuencias_basicas/frecuencias_por_lengua_y_rol_test.parquet"
+    PARQUET_OUT = f"{REPO_ROOT}/Frecuencias_basicas/analisis_de_frecuencias_def_test.parquet"
 
 # --- Si quieres montar Drive, descomenta ---
 # if EN_COLAB:
 #     drive.mount("/content/drive")
 
+# --- Índice persistente de archivos (opcional; Scripts/00_COREC_comun/corec_indice.py) ---
+try:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "00_COREC_comun"))
+    import corec_indice
+except Exception:
+    corec_indice = None
+
+# --- Formato tokenizado común (opcional; Scripts/00_COREC_comun/corec_tokenizado.py, necesita NumPy) ---
+try:
+    import corec_tokenizado
+except Exception:
+    corec_tokenizado = None
+
 # -----------------------------------------------
 #   PATRONES
 # -----------------------------------------------
@@ -57,16 +92,224 @@ BRACKET_SPLIT = re.compile(r'(\[[^\]]*\]|\([^)]*\)|<[^>]*>)')
 REMOVE_COLON_IN_TOKEN = re.compile(r'^:|:$|(?<=\w):(?=\w)')
 
 # Token normal (solo letras, incluidos acentos)
-VALID_TOKEN = re.compile(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑüÜ]+$')
+LETRAS = 'a-zA-ZáéíóúÁÉÍÓÚñÑüÜ'
+VALID_TOKEN = re.compile(rf'^[{LETRAS}]+$')
 
+# Etiqueta de turno suelta (en cualquier posición, sin distinguir mayúsculas)
+TAG_SUELTA = re.compile(TAG_SEQ, re.IGNORECASE)
 
-def process_file(path):
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        lines = f.readlines()
+# Marcas que no se cuentan como tokens
+NO_TOKENS = {"tl", "sbx", "r"}
+
+# Tokenizador de un segmento sin corchetes, en una sola pasada:
+#   pal  -> token formado solo por letras (el caso habitual): ya es válido tal cual
+#   otro -> cualquier otro token separado por espacios: pasa por las reglas completas
+TOKEN = re.compile(rf'(?P<pal>(?<!\S)[{LETRAS}]+(?!\S))|(?P<otro>\S+)')
+
+# Palabras que, solas, son una etiqueta de turno (e, i, inf, ent, c) o una marca excluida
+PALABRAS_EXCLUIDAS = {"e", "i", "inf", "ent", "c"} | NO_TOKENS
+
+
+@lru_cache(maxsize=1 << 16)
+def normalizar_token(tok):
+    """Forma normalizada (minúsculas) de un token que no es solo letras, o None si no cuenta."""
+    #  1) El ":" NUNCA es token; si va pegado a palabra lo limpiamos en memoria
+    tok = REMOVE_COLON_IN_TOKEN.sub("", tok)
+    if not tok:
+        return None
+
+    #  2) Saltar marcas prosódicas /, //, ///
+    if PROSODIC.fullmatch(tok):
+        return None
+
+    #  3) Saltar etiquetas de turno que hayan quedado sueltas
+    if TAG_SUELTA.fullmatch(tok):
+        return None
+
+    #  4) Quitar puntuación lateral (.,;!?…)
+    tok_clean = tok.strip(".,;:!?¡¿\"'")
+
+    #  5) Tratar los guiones: guion NO es token,
+    #     pero la palabra con la que va SÍ.
+    #     bue-no -> bueno ; cho- -> cho ; -cho -> cho ; marca-o -> marcao
+    tok_clean = tok_clean.replace("-", "")
+    if not tok_clean:
+        return None
 
-    tokens_inf = []
-    tokens_ent = []
-    curr_speaker = None  # 'INF' o 'ENT'
+    #  6) Ver si es una palabra alfabética válida
+    if not VALID_TOKEN.fullmatch(tok_clean):
+        return None
+    if tok_clean.lower() in NO_TOKENS:
+        return None
+
+    #  7) Normalizar solo para conteos (no toca el archivo original)
+    return tok_clean.lower()
+
+
+def tokens_de_texto(text, toks):
+    """
+    Añade a `toks` los tokens válidos (normalizados) de un texto y devuelve
+    (marcas_ruido, marcas_aclaracion) encontradas en él.
+    """
+    marcas_ruido = 0
+    marcas_aclaracion = 0
+
+    # 2 Dividir en segmentos: fuera y dentro de corchetes/paréntesis/angulares
+    parts = BRACKET_SPLIT.split(text)
+
+    for part in parts:
+        if not part:
+            continue
+
+        # Caso A: parte es una marca [ ... ] / ( ... ) / < ... >
+        if part[0] in "[(<" and part[-1] in "])>":
+            inner = part[1:-1].strip()
+            if not inner:
+                continue
+
+            # Ruido / ininteligible si empieza por IN (cualquier mayús/minús)
+            if inner.upper().startswith("IN"):
+                marcas_ruido += 1
+                # NO se cuenta como token
+            else:
+                # Aclaración (corrección, glosa, etc.)
+                marcas_aclaracion += 1
+                # NO se cuenta como token
+            continue
+
+        # Caso B: parte es texto normal (fuera de corchetes)
+        for pal, otro in TOKEN.findall(part):
+            if pal:
+                tok_norm = pal.lower()
+                if tok_norm in PALABRAS_EXCLUIDAS:
+                    continue
+            else:
+                tok_norm = normalizar_token(otro)
+                if tok_norm is None:
+                    continue
+
+            toks.append(tok_norm)
+
+    return marcas_ruido, marcas_aclaracion
+
+
+class RiquezaLexica:
+    """
+    Métricas de riqueza léxica de una entrevista, calculadas en una sola pasada
+    sobre los tokens (en orden de aparición, los dos hablantes juntos):
+
+    - MATTR: media del TTR de todas las ventanas de VENTANA_MATTR tokens consecutivos.
+      Solo se guardan los tokens de la ventana actual y sus recuentos.
+      Si la entrevista tiene menos tokens que la ventana, se usa el TTR.
+    - K de Yule: 10^4 * (Σ f² - N) / N², a partir de los recuentos por forma.
+    - Curva de Heaps: nº de formas distintas tras 10, 20, 50, 100, 200, 500... tokens
+      (y al final), y su ajuste V = k * N^beta por mínimos cuadrados en escala log-log.
+    """
+
+    def __init__(self, ventana=None):
+        self.ventana = ventana or VENTANA_MATTR
+        self.frec = Counter()   # recuento de cada forma (el vocabulario, no la lista de tokens)
+        self.n = 0
+        self.cola = deque()     # tokens de la ventana actual
+        self.en_ventana = {}    # forma -> apariciones en la ventana actual
+        self.suma_tipos = 0     # suma de las formas distintas de cada ventana completa
+        self.curva = []         # (tokens, formas) en los puntos de muestreo
+        self._serie = self._puntos()
+        self.siguiente = next(self._serie)
+
+    @staticmethod
+    def _puntos():
+        """10, 20, 50, 100, 200, 500, 1000..."""
+        base = 1
+        while True:
+            for m in (10, 20, 50):
+                yield base * m
+            base *= 10
+
+    def anadir(self, toks):
+        """Añade los tokens de una línea."""
+        # Vocabulario y curva de Heaps: se cuenta por tramos entre puntos de muestreo
+        frec = self.frec
+        i = 0
+        while self.n + len(toks) - i >= self.siguiente:
+            j = i + self.siguiente - self.n
+            frec.update(toks[i:j])
+            self.n = self.siguiente
+            self.curva.append((self.n, len(frec)))
+            self.siguiente = next(self._serie)
+            i = j
+        frec.update(toks[i:])
+        self.n += len(toks) - i
+
+        # MATTR: ventana móvil con el recuento de cada forma dentro de ella
+        cola, en_ventana, ventana = self.cola, self.en_ventana, self.ventana
+        get = en_ventana.get
+        suma = 0
+        for tok in toks:
+            cola.append(tok)
+            en_ventana[tok] = get(tok, 0) + 1
+            if len(cola) > ventana:
+                viejo = cola.popleft()
+                c = en_ventana[viejo]
+                if c == 1:
+                    del en_ventana[viejo]
+                else:
+                    en_ventana[viejo] = c - 1
+                suma += len(en_ventana)
+            elif len(cola) == ventana:
+                suma += len(en_ventana)
+        self.suma_tipos += suma
+
+    def mattr(self):
+        if self.n >= self.ventana:
+            return self.suma_tipos / (self.ventana * (self.n - self.ventana + 1))
+        return len(self.frec) / self.n if self.n else 0.0
+
+    def yule_k(self):
+        if not self.n:
+            return 0.0
+        suma_f2 = sum(f * f for f in self.frec.values())
+        return 1e4 * (suma_f2 - self.n) / (self.n * self.n)
+
+    def curva_heaps(self):
+        """Puntos (tokens, formas) de la curva, incluido el final de la entrevista."""
+        if self.n and (not self.curva or self.curva[-1][0] != self.n):
+            return self.curva + [(self.n, len(self.frec))]
+        return list(self.curva)
+
+    def ajuste_heaps(self):
+        """(beta, k) de V = k * N^beta, o (0.0, 0.0) con menos de dos puntos."""
+        puntos = self.curva_heaps()
+        if len(puntos) < 2:
+            return 0.0, 0.0
+        xs = [math.log(n) for n, _ in puntos]
+        ys = [math.log(v) for _, v in puntos]
+        mx = sum(xs) / len(xs)
+        my = sum(ys) / len(ys)
+        sxx = sum((x - mx) ** 2 for x in xs)
+        beta = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+        return beta, math.exp(my - beta * mx)
+
+
+def hablante(tag):
+    """'INF' o 'ENT' según la etiqueta de turno (E, E1/E2, I, INF, ENT...)."""
+    tag = tag.upper()
+    if tag.startswith("I") or tag.startswith("INF") or tag.startswith("C"):
+        return "INF"
+    return "ENT"
+
+
+def contar_tokens(lines):
+    """
+    Recorre las líneas de una entrevista y devuelve
+    (frecuencias del informante, frecuencias del entrevistador, marcas_ruido, marcas_aclaracion,
+    riqueza léxica). Solo se guardan los recuentos por forma y la ventana del MATTR:
+    la memoria depende del vocabulario, no de la longitud.
+    """
+    cnt_inf = Counter()
+    cnt_ent = Counter()
+    riqueza = RiquezaLexica()
+    cnt = None  # Counter del hablante actual ('INF' o 'ENT')
 
     marcas_ruido = 0
     marcas_aclaracion = 0
@@ -75,107 +318,125 @@ def process_file(path):
         # 1 Detectar etiqueta de turno
         m = TAG_TURN.match(line)
         if m:
-            tag = m.group(1).upper()  # E, E1/E2, I, INF, ENT...
             # Solo para decidir quién habla; NO es token
-            if tag.startswith("I") or tag.startswith("INF") or tag.startswith("C"):
-                curr_speaker = "INF"
-            else:
-                curr_speaker = "ENT"
+            cnt = cnt_inf if hablante(m.group(1)) == "INF" else cnt_ent
             text = m.group(2)
         else:
             text = line
 
         # Si todavía no sabemos quién habla, no contamos tokens
-        if curr_speaker is None:
+        if cnt is None:
             continue
 
-        # 2 Dividir en segmentos: fuera y dentro de corchetes/paréntesis/angulares
-        parts = BRACKET_SPLIT.split(text)
-
-        for part in parts:
-            if not part:
-                continue
-
-            # Caso A: parte es una marca [ ... ] / ( ... ) / < ... >
-            if part[0] in "[(<" and part[-1] in "])>":
-                inner = part[1:-1].strip()
-                if not inner:
-                    continue
-
-                # Ruido / ininteligible si empieza por IN (cualquier mayús/minús)
-                if inner.upper().startswith("IN"):
-                    marcas_ruido += 1
-                    # NO se cuenta como token
-                else:
-                    # Aclaración (corrección, glosa, etc.)
-                    marcas_aclaracion += 1
-                    # NO se cuenta como token
-                continue
+        toks = []  # tokens de esta línea
+        ruido, aclaracion = tokens_de_texto(text, toks)
+        marcas_ruido += ruido
+        marcas_aclaracion += aclaracion
 
-            # Caso B: parte es texto normal (fuera de corchetes)
-            raw_tokens = [t for t in part.split() if t.strip()]
+        #  Asignar al hablante correspondiente (Counter.update cuenta la línea de una vez)
+        cnt.update(toks)
+        riqueza.anadir(toks)
 
-            for tok in raw_tokens:
-                #  1) El ":" NUNCA es token; si va pegado a palabra lo limpiamos en memoria
-                tok = REMOVE_COLON_IN_TOKEN.sub("", tok)
-                if not tok:
-                    continue
+    return cnt_inf, cnt_ent, marcas_ruido, marcas_aclaracion, riqueza
 
-                #  2) Saltar marcas prosódicas /, //, ///
-                if PROSODIC.fullmatch(tok):
-                    continue
 
-                #  3) Saltar etiquetas de turno que hayan quedado sueltas
-                if re.fullmatch(TAG_SEQ, tok, flags=re.IGNORECASE):
-                    continue
-
-                #  4) Quitar puntuación lateral (.,;!?…)
-                tok_clean = tok.strip(".,;:!?¡¿\"'")
-                if not tok_clean:
-                    continue
+# -----------------------------------------------
+#   Lectura desde el formato tokenizado común
+# -----------------------------------------------
+_FORMAS = {}
+
+
+def formas_del_vocab(tk):
+    """
+    Forma normalizada (o None) de cada token del vocabulario del formato tokenizado.
+    Se calcula una vez por proceso: cada forma distinta pasa una sola vez por las reglas.
+    """
+    if tk.carpeta not in _FORMAS:
+        formas = []
+        for tok in tk.vocab:
+            if VALID_TOKEN.fullmatch(tok):
+                tok = tok.lower()
+                formas.append(None if tok in PALABRAS_EXCLUIDAS else tok)
+            else:
+                formas.append(normalizar_token(tok))
+        _FORMAS[tk.carpeta] = formas
+    return _FORMAS[tk.carpeta]
+
+
+def contar_tokens_tokenizado(tk, path):
+    """
+    Igual que contar_tokens, pero a partir de los registros del formato tokenizado.
+    Las líneas sin corchetes se cuentan directamente por identificador de token;
+    las demás se vuelven a segmentar desde su texto.
+    """
+    formas = formas_del_vocab(tk)
+    regs = tk.registros_de(path)
+    cnt_inf = Counter()
+    cnt_ent = Counter()
+    cnt = None
+    riqueza = RiquezaLexica()
 
-                #  5) Tratar los guiones: guion NO es token,
-                #     pero la palabra con la que va SÍ.
-                #     bue-no -> bueno ; cho- -> cho ; -cho -> cho ; marca-o -> marcao
-                tok_clean = tok_clean.replace("-", "")
-                if not tok_clean:
-                    continue
+    marcas_ruido = 0
+    marcas_aclaracion = 0
+    if not len(regs):
+        return cnt_inf, cnt_ent, marcas_ruido, marcas_aclaracion, riqueza
+
+    roles = [hablante(e) for e in tk.etiquetas]
+    t0 = int(regs["tok_ini"][0])
+    ids = tk.tokens[t0:int(regs["tok_fin"][-1])].tolist()
+    x_0 = int(regs["txt_ini"][0])
+    texto = tk.texto[x_0:int(regs["txt_fin"][-1])].tobytes()
+
+    for etq, corchetes, a, b, x0, x1 in zip(
+        regs["etiqueta"].tolist(), regs["corchetes"].tolist(),
+        regs["tok_ini"].tolist(), regs["tok_fin"].tolist(),
+        regs["txt_ini"].tolist(), regs["txt_fin"].tolist(),
+    ):
+        if etq >= 0:
+            cnt = cnt_inf if roles[etq] == "INF" else cnt_ent
+        if cnt is None:
+            continue
 
-                #  6) Ver si es una palabra alfabética válida
-                if not VALID_TOKEN.fullmatch(tok_clean):
-                    continue
-                if tok_clean.lower() in {"tl", "sbx", "r"}:
-                    continue
+        if corchetes:
+            toks = []
+            ruido, aclaracion = tokens_de_texto(texto[x0 - x_0:x1 - x_0].decode("utf-8"), toks)
+            marcas_ruido += ruido
+            marcas_aclaracion += aclaracion
+        else:
+            toks = [f for f in map(formas.__getitem__, ids[a - t0:b - t0]) if f is not None]
+        cnt.update(toks)
+        riqueza.anadir(toks)
 
-                #  7) Normalizar solo para conteos (no toca el archivo original)
-                tok_norm = tok_clean.lower()
+    return cnt_inf, cnt_ent, marcas_ruido, marcas_aclaracion, riqueza
 
-                #  8) Asignar al hablante correspondiente
-                if curr_speaker == "INF":
-                    tokens_inf.append(tok_norm)
-                else:
-                    tokens_ent.append(tok_norm)
 
+def metricas(cnt_inf, cnt_ent, marcas_ruido, marcas_aclaracion, riqueza):
     # -------------------------------
     #   Métricas por entrevista
     # -------------------------------
-    tokens_totales = len(tokens_inf) + len(tokens_ent)
+    n_inf = cnt_inf.total()
+    n_ent = cnt_ent.total()
+    tokens_totales = n_inf + n_ent
     if tokens_totales > 0:
-        prop_inf = round(len(tokens_inf) / tokens_totales, 3)
+        prop_inf = round(n_inf / tokens_totales, 3)
     else:
         prop_inf = 0.0
         
-    # Frecuencias léxicas
-    freqs = Counter(tokens_inf + tokens_ent)
+    # Frecuencias léxicas (recuentos de los dos hablantes sumados)
+    freqs = cnt_inf + cnt_ent
     types_total = len(freqs)
-    hapax = sum(1 for _, f in freqs.items() if f == 1)
-    freq_2_5 = sum(1 for _, f in freqs.items() if 2 <= f <= 5)
+    hapax = sum(1 for f in freqs.values() if f == 1)
+    freq_2_5 = sum(1 for f in freqs.values() if 2 <= f <= 5)
     pct_2_5 = round(freq_2_5 / types_total * 100, 2) if types_total > 0 else 0.0
 
+    # Riqueza léxica independiente de la longitud (calculada durante la lectura)
+    heaps_beta, heaps_k = riqueza.ajuste_heaps()
+    curva_heaps = " ".join(f"{n}:{v}" for n, v in riqueza.curva_heaps())
+
     return (
         tokens_totales,
-        len(tokens_inf),
-        len(tokens_ent),
+        n_inf,
+        n_ent,
         prop_inf,
         types_total,
         hapax,
@@ -183,9 +444,19 @@ def process_file(path):
         pct_2_5,
         marcas_ruido,
         marcas_aclaracion,
+        round(riqueza.mattr(), 4),
+        round(riqueza.yule_k(), 2),
+        round(heaps_beta, 4),
+        round(heaps_k, 3),
+        curva_heaps,
     )
 
 
+def process_file(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return metricas(*contar_tokens(f))
+
+
 # -----------------------------------------------
 #   Crear el CSV de salida
 # -----------------------------------------------
@@ -203,40 +474,230 @@ fields = [
     "%_freq_2_5",
     "marcas_ruido",
     "marcas_aclaracion",
+    "mattr",
+    "yule_k",
+    "heaps_beta",
+    "heaps_k",
+    "curva_heaps",
 ]
 
-with open(CSV_OUT, "w", encoding="utf-8", newline="") as csvfile:
-    writer = csv.writer(csvfile, delimiter=";")
-    writer.writerow(fields)
-
-    for dp, _, files in os.walk(ROOT_IN):
-        for file in files:
-            if not file.lower().endswith(".txt"):
-                continue
-
-            id_muestra = file[:-4]  # sin .txt
-
-            # id_muestra = codLengua_codPais_codRegion_...
-            partes = id_muestra.split("_")
-            codLengua = partes[0] if len(partes) > 0 else ""
-            codPais   = partes[1] if len(partes) > 1 else ""
+# Tipos de cada columna en la copia Parquet
+TIPOS_TABLA = {
+    "id_muestra": "string",
+    "lengua_contacto": "string",
+    "pais_region": "string",
+    "tokens_totales": "int64",
+    "tokens_entrevistado": "int64",
+    "tokens_entrevistador": "int64",
+    "prop_entrevistado": "float64",
+    "types_total": "int64",
+    "hapax": "int64",
+    "freq_2_5": "int64",
+    "%_freq_2_5": "float64",
+    "marcas_ruido": "int64",
+    "marcas_aclaracion": "int64",
+    "mattr": "float64",
+    "yule_k": "float64",
+    "heaps_beta": "float64",
+    "heaps_k": "float64",
+    "curva_heaps": "string",
+}
+
+
+def listar_txt(root: str) -> list:
+    """TXT bajo root (recursivo): desde el índice persistente si está disponible, si no con os.walk."""
+    if USAR_INDICE and corec_indice is not None:
+        return corec_indice.listar_txt(root, ignorar_mayusculas=True)
+    return [
+        os.path.join(dp, name)
+        for dp, _, files in os.walk(root)
+        for name in files
+        if name.lower().endswith(".txt")
+    ]
+
+
+def analizar_archivo(path, tk=None):
+    """
+    Fila de una entrevista (identificadores sin apóstrofo), su código de lengua y los
+    recuentos de cada hablante. Con `tk` (formato tokenizado) no se vuelve a leer el TXT.
+    """
+    file = os.path.basename(path)
+
+    id_muestra = file[:-4]  # sin .txt
+
+    # id_muestra = codLengua_codPais_codRegion_...
+    partes = id_muestra.split("_")
+    codLengua = partes[0] if len(partes) > 0 else ""
+    codPais   = partes[1] if len(partes) > 1 else ""
+
+    if tk is not None:
+        cnt_inf, cnt_ent, marcas_ruido, marcas_aclaracion, riqueza = contar_tokens_tokenizado(tk, path)
+    else:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            cnt_inf, cnt_ent, marcas_ruido, marcas_aclaracion, riqueza = contar_tokens(f)
+    vals = metricas(cnt_inf, cnt_ent, marcas_ruido, marcas_aclaracion, riqueza)
 
-            path = os.path.join(dp, file)
-            print("→ Procesando:", path)
+    row = [id_muestra, codLengua, codPais] + list(vals)
+    return row, codLengua, cnt_inf, cnt_ent
 
-            vals = process_file(path)
 
-          #  Proteger identificadores como texto para que Excel NO los modifique
-            id_txt = "'" + id_muestra
-            lang_txt = "'" + codLengua
-            pais_txt = "'" + codPais
+def fila_csv(row):
+    """Fila para el CSV: identificadores protegidos como texto para que Excel NO los modifique."""
+    id_muestra, codLengua, codPais = row[:3]
+    return ["'" + id_muestra, "'" + codLengua, "'" + codPais] + row[3:]
 
-            row = [id_txt, lang_txt, pais_txt] + list(vals)
-            writer.writerow(row)
 
+# -----------------------------------------------
+#   Tablas de frecuencias (map-reduce)
+# -----------------------------------------------
+_TOKENIZADOS = {}
+
+
+def analizar_lote(rutas, carpeta_tk=None):
+    """
+    Map: filas de un lote de TXT y, si TABLAS_FRECUENCIAS, sus recuentos
+    sumados por (lengua, rol). Así cada proceso devuelve un Counter por lengua y rol,
+    no uno por archivo. `carpeta_tk`: formato tokenizado (cada proceso lo abre una vez).
+    """
+    tk = None
+    if carpeta_tk is not None:
+        if carpeta_tk not in _TOKENIZADOS:
+            _TOKENIZADOS[carpeta_tk] = corec_tokenizado.Tokenizado(carpeta_tk)
+        tk = _TOKENIZADOS[carpeta_tk]
+
+    filas = []
+    recuentos = {}
+    for path in rutas:
+        row, lengua, cnt_inf, cnt_ent = analizar_archivo(path, tk)
+        filas.append(row)
+        if TABLAS_FRECUENCIAS:
+            recuentos.setdefault((lengua, "INF"), Counter()).update(cnt_inf)
+            recuentos.setdefault((lengua, "ENT"), Counter()).update(cnt_ent)
+    return filas, recuentos
+
+
+def sumar_recuentos(total, parcial):
+    """Reduce: suma los recuentos de un lote a los totales por (lengua, rol)."""
+    for clave, cnt in parcial.items():
+        if clave in total:
+            total[clave].update(cnt)
+        else:
+            total[clave] = cnt
+
+
+def parquet_disponible():
+    """True si están instalados pandas y pyarrow (sin importarlos)."""
+    return all(importlib.util.find_spec(m) is not None for m in ("pandas", "pyarrow"))
+
+
+def comprobar_parquet():
+    if not parquet_disponible():
+        raise RuntimeError(
+            "TABLAS_FRECUENCIAS = True necesita pandas y pyarrow para escribir Parquet.\n"
+            "Instala:\n"
+            "  pip install pandas pyarrow\n"
+            "o pon TABLAS_FRECUENCIAS = False."
+        )
+
+
+def guardar_tabla_parquet(filas, ruta):
+    """Escribe las filas del CSV en Parquet, con identificadores limpios y columnas tipadas."""
+    import pandas as pd
+
+    df = pd.DataFrame(filas, columns=fields).astype(TIPOS_TABLA)
+    Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(ruta, index=False)
+
+
+def guardar_tablas(recuentos, ruta):
+    """
+    Escribe la tabla larga (lengua, rol, forma, frecuencia) en Parquet: una fila por
+    forma para cada lengua y rol (INF/ENT), más las del corpus completo con lengua = "TOTAL".
+    """
+    import pandas as pd
+
+    globales = {}
+    for (lengua, rol), cnt in recuentos.items():
+        globales.setdefault(("TOTAL", rol), Counter()).update(cnt)
+
+    columnas = {"lengua": [], "rol": [], "forma": [], "frecuencia": []}
+    for (lengua, rol), cnt in sorted(recuentos.items()) + sorted(globales.items()):
+        for forma, n in sorted(cnt.items(), key=lambda x: (-x[1], x[0])):
+            columnas["lengua"].append(lengua)
+            columnas["rol"].append(rol)
+            columnas["forma"].append(forma)
+            columnas["frecuencia"].append(n)
+
+    df = pd.DataFrame(columnas).astype({
+        "lengua": "category", "rol": "category", "forma": "string", "frecuencia": "int64"
+    })
+    Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(ruta, index=False)
+    return len(df)
+
+
+def abrir_tokenizado(rutas):
+    """Carpeta del formato tokenizado de ROOT_IN (construido si hace falta), o None para leer los TXT."""
+    if not USAR_TOKENIZADO or corec_tokenizado is None:
+        return None
+    try:
+        tk = corec_tokenizado.obtener(ROOT_IN, rutas, TAG_TURN, etiqueta=1, texto=2)
+    except Exception as e:
+        print(f"⚠ Formato tokenizado no disponible ({type(e).__name__}: {e}); se leen los TXT.")
+        return None
+    print("Formato tokenizado:", tk.carpeta)
+    return tk.carpeta
+
+
+def main():
+    if TABLAS_FRECUENCIAS:
+        comprobar_parquet()
+
+    con_parquet = TABLA_PARQUET and parquet_disponible()
+    if TABLA_PARQUET and not con_parquet:
+        print("⚠ Sin pandas/pyarrow: no se escribe", PARQUET_OUT, "(solo el CSV).")
+
+    rutas = listar_txt(ROOT_IN)
+    recuentos = {}
+    tabla = []  # filas para la copia Parquet
+    t0 = time.perf_counter()
+    carpeta_tk = abrir_tokenizado(rutas)
+
+    with open(CSV_OUT, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.writer(csvfile, delimiter=";")
+        writer.writerow(fields)
+
+        if N_WORKERS > 1 and len(rutas) > 1:
+            # lotes contiguos: las filas salen en el mismo orden que en modo secuencial
+            print(f"Analizando {len(rutas)} TXT con {N_WORKERS} procesos...")
+            tam = max(1, len(rutas) // (N_WORKERS * 8))
+            lotes = [rutas[i:i + tam] for i in range(0, len(rutas), tam)]
+            with ProcessPoolExecutor(max_workers=N_WORKERS) as ex:
+                for filas, parcial in ex.map(analizar_lote, lotes, [carpeta_tk] * len(lotes)):
+                    writer.writerows(map(fila_csv, filas))
+                    if con_parquet:
+                        tabla.extend(filas)
+                    sumar_recuentos(recuentos, parcial)
+        else:
+            for path in rutas:
+                print("→ Procesando:", path)
+                filas, parcial = analizar_lote([path], carpeta_tk)
+                writer.writerows(map(fila_csv, filas))
+                if con_parquet:
+                    tabla.extend(filas)
+                sumar_recuentos(recuentos, parcial)
 
+    print("analisis de frecuencias_def. CSV generado en:", CSV_OUT)
 
-print("analisis de frecuencias_def. CSV generado en:", CSV_OUT)
+    if con_parquet:
+        guardar_tabla_parquet(tabla, PARQUET_OUT)
+        print("Copia tipada (Parquet) en:", PARQUET_OUT)
 
+    if TABLAS_FRECUENCIAS:
+        n = guardar_tablas(recuentos, FREQ_OUT)
+        print(f"Tablas de frecuencias (lengua x rol y global, {n} filas) en: {FREQ_OUT}")
+    print(f"{len(rutas)} TXT en {time.perf_counter() - t0:.1f} s")
 
 
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,19 @@
 # -*- coding: utf-8 -*-
 
 """
-1) Requisitos: Python 3.10+ (pandas)
+1) Requisitos: Python 3.10+ (pandas, numpy)
 2) Edita CONFIG:
    - CSV_BASE: ruta del CSV de frecuencias (analisis_de_frecuencias_def.csv)
+   - PARQUET_BASE: copia tipada en Parquet de la etapa 05 (se usa si existe y está al día)
    - OUT_DIR: carpeta de salida (CSVs por lengua + global)
    - K: nº de entrevistas prototípicas por lengua
+   - MODO_SELECCION: "mediana" (distancia a la mediana) o "medoides" (k-medoides por lengua)
 3) Ejecuta:
    python 06_COREC_seleccion_muestra_prototipica.py
 """
 
 import os
+import numpy as np
 import pandas as pd
 
 # --- Colab opcional ---
@@ -26,13 +29,29 @@ except Exception:
 # =========================
 # --- LOCAL (por defecto; ejecutando desde la raíz del repo COREC) ---
 CSV_BASE = "Frecuencias_basicas/analisis_de_frecuencias_def.csv"
+PARQUET_BASE = "Frecuencias_basicas/analisis_de_frecuencias_def.parquet"
 OUT_DIR  = "Muestras_prototipicas/muestras_por_lengua"
 K = 5
 
+# Criterio de selección:
+#   "mediana"  -> las K entrevistas más cercanas a la mediana de su lengua (por defecto)
+#   "medoides" -> los K medoides de su lengua (k-medoides sobre VARIABLES_MEDOIDES estandarizadas)
+MODO_SELECCION = "mediana"
+VARIABLES_MEDOIDES = [
+    "ratio_entrevistado",
+    "ratio_freq_2_5",
+    "ratio_ruido",
+    "mattr",
+    "yule_k",
+    "heaps_beta",
+]
+MAX_ELEMENTOS_BLOQUE = 4_000_000  # nº máximo de distancias por bloque (~32 MB en float64)
+
 # --- COLAB (opcional; carpeta COREC subida a MyDrive) ---
 if EN_COLAB:
     REPO_ROOT = "/content/drive/MyDrive/COREC"
     CSV_BASE = f"{REPO_ROOT}/Frecuencias_basicas/analisis_de_frecuencias_def_test.csv"
+    PARQUET_BASE = f"{REPO_ROOT}/Frecuencias_basicas/analisis_de_frecuencias_def_test.parquet"
     OUT_DIR  = f"{REPO_ROOT}/Muestras_prototipicas/muestras_por_lengua_test"
 
 # --- Si quieres montar Drive, descomenta ---
@@ -40,72 +59,245 @@ if EN_COLAB:
 #     drive.mount("/content/drive")
 # =========================
 
-# Crear carpeta de salida si no existe
-os.makedirs(OUT_DIR, exist_ok=True)
+# Identificadores: limpios en memoria, con apóstrofo inicial solo en los CSV (para Excel)
+IDS = ["id_muestra", "lengua_contacto", "pais_region"]
 
-# ---------- 1) Cargar el CSV base COMPLETO ----------
-df_base = pd.read_csv(CSV_BASE, delimiter=";", encoding="utf-8")
 
+def cargar_base():
+    """
+    Tabla de frecuencias de la etapa 05 con identificadores limpios.
+    Se lee la copia Parquet si existe y no es más antigua que el CSV; si no, el CSV
+    (quitando el apóstrofo inicial de los identificadores).
+    """
+    if os.path.exists(PARQUET_BASE) and (
+        not os.path.exists(CSV_BASE) or os.path.getmtime(PARQUET_BASE) >= os.path.getmtime(CSV_BASE)
+    ):
+        try:
+            df = pd.read_parquet(PARQUET_BASE)
+            print("Leyendo:", PARQUET_BASE)
+            return df
+        except ImportError:
+            print("⚠ Sin pyarrow para leer Parquet; se lee el CSV.")
+
+    df = pd.read_csv(CSV_BASE, delimiter=";", encoding="utf-8", dtype={c: "string" for c in IDS})
+    for c in IDS:
+        df[c] = df[c].str.lstrip("'")
+    print("Leyendo:", CSV_BASE)
+    return df
+
+
+def a_csv(df, ruta):
+    """Escribe df en CSV con los identificadores protegidos como texto para Excel."""
+    df = df.copy()
+    for c in IDS:
+        df[c] = "'" + df[c]
+    df.to_csv(ruta, sep=";", index=False, encoding="utf-8")
+
+
+def bloques_distancias(X, Y):
+    """
+    Distancias Manhattan entre las filas de X y las de Y, por bloques de filas de X:
+    devuelve (inicio, bloque) con bloque[i, j] = |X[inicio + i] - Y[j]|. Cada bloque tiene
+    como mucho MAX_ELEMENTOS_BLOQUE distancias, sea cual sea el tamaño de X.
+    """
+    paso = max(1, MAX_ELEMENTOS_BLOQUE // max(1, len(Y)))
+    for i in range(0, len(X), paso):
+        bloque = X[i:i + paso]
+        d = np.zeros((len(bloque), len(Y)))
+        for v in range(X.shape[1]):  # variable a variable: sin matriz intermedia de 3 dimensiones
+            d += np.abs(bloque[:, v, None] - Y[None, :, v])
+        yield i, d
 
-# Lenguas a procesar
-lenguas = df_base["lengua_contacto"].dropna().unique()
-print("Lenguas que se van a procesar:", lenguas)
 
-selecciones = []
+def cercanos(X, centros):
+    """
+    Para cada fila de X: medoide más cercano (posición en `centros`), su distancia
+    y la distancia al segundo medoide más cercano (inf si solo hay uno).
+    """
+    grupo = np.empty(len(X), dtype=np.int64)
+    d1 = np.empty(len(X))
+    d2 = np.full(len(X), np.inf)
+    for i, d in bloques_distancias(X, X[centros]):
+        filas = np.arange(len(d))
+        g = d.argmin(axis=1)
+        grupo[i:i + len(d)] = g
+        d1[i:i + len(d)] = d[filas, g]
+        if len(centros) > 1:
+            d[filas, g] = np.inf
+            d2[i:i + len(d)] = d.min(axis=1)
+    return grupo, d1, d2
 
-for LENGUA_OBJETIVO in lenguas:
-    print(f"\n=== Procesando lengua {LENGUA_OBJETIVO} ===")
 
-    # ---------- 2) Filtrar esta lengua ----------
-    df_lang = df_base[df_base["lengua_contacto"] == LENGUA_OBJETIVO].copy()
-    if df_lang.empty:
-        print("  (Sin datos, se salta)")
-        continue
+def suma_distancias(X):
+    """Suma de las distancias de cada fila de X a todas las demás (sin guardar la matriz)."""
+    suma = np.empty(len(X))
+    for i, d in bloques_distancias(X, X):
+        suma[i:i + len(d)] = d.sum(axis=1)
+    return suma
 
-    # ---------- 3) Conversiones a RATIOS ----------
-    df_lang["ratio_entrevistado"] = df_lang["prop_entrevistado"]
-    df_lang["ratio_types"]       = df_lang["types_total"] / df_lang["tokens_totales"]
-    df_lang["ratio_freq_2_5"]    = df_lang["freq_2_5"] / df_lang["types_total"]
-    df_lang["ratio_ruido"]       = df_lang["marcas_ruido"] / df_lang["tokens_totales"]
 
-    df = df_lang.copy()
+def k_medoides(X, k, max_iter=100):
+    """
+    k-medoides PAM: BUILD (medoides iniciales voraces) y SWAP (se cambia un medoide por
+    otra fila mientras baje la suma de distancias de cada fila a su medoide). Es determinista
+    y el resultado no depende del tamaño de los bloques.
+    Devuelve (índices de los medoides, grupo de cada fila, distancia de cada fila a su medoide).
+    Si hay menos de k filas distintas, devuelve menos medoides (no se repiten filas iguales).
+    """
+    n = len(X)
 
-    # ---------- 4) Distancia Manhattan a la mediana ----------
+    # BUILD: la fila con menor suma de distancias y, después, la que más reduce la suma
+    centros = [int(suma_distancias(X).argmin())]
+    grupo, d1, d2 = cercanos(X, centros)
+    while len(centros) < min(k, n):
+        mejor, ganancia = -1, 0.0
+        for i, d in bloques_distancias(X, X):
+            g = np.maximum(d1[None, :] - d, 0).sum(axis=1)
+            j = int(g.argmax())
+            if g[j] > ganancia:
+                mejor, ganancia = i + j, g[j]
+        if mejor < 0:
+            break  # el resto de filas repiten las de algún medoide
+        centros.append(mejor)
+        grupo, d1, d2 = cercanos(X, centros)
+
+    # SWAP: en cada pasada se aplica el mejor cambio (medoide c -> fila h) de todas las filas,
+    # mientras baje la suma; las candidatas se recorren por bloques de filas
+    for _ in range(max_iter):
+        mejor, cambio = 0.0, None
+        for i, d in bloques_distancias(X, X):
+            # variación de la suma al cambiar el medoide c por la candidata h:
+            #   filas de otros grupos -> min(d_h, d1); filas del grupo c -> min(d_h, d2)
+            comun = (np.minimum(d, d1) - d1).sum(axis=1)
+            delta = np.empty((len(d), len(centros)))
+            for c in range(len(centros)):
+                m = grupo == c
+                delta[:, c] = comun + (np.minimum(d[:, m], d2[m]) - np.minimum(d[:, m], d1[m])).sum(axis=1)
+            delta[np.isin(np.arange(i, i + len(d)), centros)] = np.inf
+            h, c = np.unravel_index(delta.argmin(), delta.shape)
+            if delta[h, c] < mejor:
+                mejor, cambio = delta[h, c], (int(i + h), int(c))
+        if cambio is None or mejor > -1e-9 * max(1.0, d1.sum()):
+            break
+        h, c = cambio
+        centros[c] = h
+        grupo, d1, d2 = cercanos(X, centros)
+
+    return np.array(centros), grupo, d1
+
+
+def estandarizar(X):
+    """Cada columna con media 0 y desviación 1 (las columnas constantes quedan a 0)."""
+    desv = X.std(axis=0)
+    desv[desv == 0] = 1.0
+    return (X - X.mean(axis=0)) / desv
+
+
+def seleccionar_mediana(df, grupos):
+    """Las K entrevistas de cada lengua con menor distancia Manhattan a la mediana de su lengua."""
     metricas = [
         "ratio_entrevistado",
         "ratio_types",
         "ratio_freq_2_5",
     ]
 
-    distancias = []
-    for m in metricas:
-        distancias.append((df[m] - df[m].median()).abs())
-
-    df["dist_total"] = sum(distancias)
+    medianas = grupos[metricas].transform("median")
+    df["dist_total"] = sum((df[m] - medianas[m]).abs() for m in metricas)
 
     # Penalización por ruido
     df["dist_total"] += df["ratio_ruido"]
 
-    # ---------- 5) Ordenar y elegir prototipos ----------
-    df_sorted = df.sort_values("dist_total")
-    df_sel = df_sorted.head(K).copy()
-    df_sel["k_orden"] = range(1, len(df_sel) + 1)
+    # por lengua (en orden de aparición) y, dentro de cada una, por distancia (orden estable)
+    df["_orden_lengua"] = grupos.ngroup()
+    df_sorted = df.sort_values(["_orden_lengua", "dist_total"], kind="mergesort")
+    df_sorted = df_sorted.drop(columns="_orden_lengua")
+
+    df_muestra = df_sorted.groupby("lengua_contacto", sort=False).head(K).copy()
+    df_muestra["k_orden"] = df_muestra.groupby("lengua_contacto", sort=False).cumcount() + 1
+    return df_muestra
 
-    # Guardar selección de esta lengua
-    selecciones.append(df_sel)
 
-    lang_code_clean = str(LENGUA_OBJETIVO).lstrip("'")
-    out_csv_lang = os.path.join(OUT_DIR, f"seleccion_{lang_code_clean}.csv")
-    df_sel.to_csv(out_csv_lang, sep=";", index=False, encoding="utf-8")
+def seleccionar_medoides(df, grupos):
+    """
+    Los K medoides de cada lengua sobre VARIABLES_MEDOIDES estandarizadas dentro de la lengua.
+    Las filas con algún valor ausente o infinito en esas variables no participan.
+    """
+    variables = [v for v in VARIABLES_MEDOIDES if v in df.columns]
+    faltan = [v for v in VARIABLES_MEDOIDES if v not in df.columns]
+    if faltan:
+        print("⚠ Variables que no están en la tabla base (se omiten):", faltan)
+    if not variables:
+        raise ValueError("MODO_SELECCION = 'medoides' necesita al menos una de VARIABLES_MEDOIDES.")
+
+    partes = []
+    for lengua, df_lang in grupos:
+        X = df_lang[variables].to_numpy(dtype=np.float64)
+        validas = np.isfinite(X).all(axis=1)
+        if not validas.any():
+            continue
+        X = estandarizar(X[validas])
+
+        centros, grupo, dist = k_medoides(X, K)
+        tam = np.bincount(grupo, minlength=len(centros))
+        suma = np.bincount(grupo, weights=dist, minlength=len(centros))
+
+        # un medoide sin entrevistas asignadas no representa a nadie: no se selecciona
+        con_grupo = tam > 0
+        sel = df_lang[validas].iloc[centros[con_grupo]].copy()
+        sel["tam_grupo"] = tam[con_grupo]
+        sel["dist_total"] = suma[con_grupo] / tam[con_grupo]  # distancia media al medoide dentro de su grupo
+        sel = sel.sort_values(["tam_grupo", "dist_total"], ascending=[False, True], kind="mergesort")
+        sel["k_orden"] = range(1, len(sel) + 1)
+        partes.append(sel)
+
+    if not partes:
+        return df.iloc[0:0]
+    return pd.concat(partes)
+
+
+# Crear carpeta de salida si no existe
+os.makedirs(OUT_DIR, exist_ok=True)
+
+# ---------- 1) Cargar la tabla base COMPLETA ----------
+df_base = cargar_base()
+
+
+# Filas con lengua (todas las lenguas a la vez: cada cálculo se agrupa por lengua_contacto)
+df = df_base[df_base["lengua_contacto"].notna()].copy()
+
+# ---------- 2) Conversiones a RATIOS ----------
+df["ratio_entrevistado"] = df["prop_entrevistado"]
+df["ratio_types"]       = df["types_total"] / df["tokens_totales"]
+df["ratio_freq_2_5"]    = df["freq_2_5"] / df["types_total"]
+df["ratio_ruido"]       = df["marcas_ruido"] / df["tokens_totales"]
+
+# Lenguas a procesar (en orden de aparición), con la tabla ya completa
+grupos = df.groupby("lengua_contacto", sort=False)
+lenguas = list(grupos.groups)
+print("Lenguas que se van a procesar:", lenguas)
+
+# ---------- 3) Elegir prototipos ----------
+print("Modo de selección:", MODO_SELECCION)
+if MODO_SELECCION == "mediana":
+    df_muestra = seleccionar_mediana(df, grupos)
+elif MODO_SELECCION == "medoides":
+    df_muestra = seleccionar_medoides(df, grupos)
+else:
+    raise ValueError(f"MODO_SELECCION desconocido: {MODO_SELECCION!r} (usa 'mediana' o 'medoides').")
+
+# ---------- 4) CSV por lengua ----------
+for LENGUA_OBJETIVO, df_sel in df_muestra.groupby("lengua_contacto", sort=False):
+    print(f"\n=== Lengua {LENGUA_OBJETIVO} ===")
+    out_csv_lang = os.path.join(OUT_DIR, f"seleccion_{LENGUA_OBJETIVO}.csv")
+    a_csv(df_sel, out_csv_lang)
 
     print(f"  → Guardado CSV: {out_csv_lang}")
     print(f"  → Entrevistas seleccionadas: {len(df_sel)}")
 
-# ---------- 6) CSV global con TODAS las lenguas ----------
-if selecciones:
-    df_corpus_oro = pd.concat(selecciones, ignore_index=True)
+# ---------- 5) CSV global con TODAS las lenguas ----------
+if not df_muestra.empty:
     out_global = os.path.join(OUT_DIR, "muestra_prototipica_global.csv")
-    df_corpus_oro.to_csv(out_global, sep=";", index=False, encoding="utf-8")
+    a_csv(df_muestra, out_global)
     print("\nMuestra_global guardado en:", out_global)
 else:
     print("\nNo se generaron selecciones.")
@@ -13,6 +13,7 @@
 
 import os
 import re
+import sys
 from pathlib import Path
 
 # --- Colab opcional ---
@@ -36,6 +37,8 @@ print("spaCy cargado:", nlp.meta["name"])
 # --- LOCAL---
 ROOT_IN  = "Corpus/TXT/Ren_limpio_fase_0"
 ROOT_OUT = "Preprocesamiento_linguistico/1_Textos_segmentacion_discursiva"
+USAR_INDICE = False  # True: listar los TXT desde el índice persistente (sin validar aún en Drive; si no está disponible, se recorre la carpeta)
+USAR_TOKENIZADO = True  # leer turnos del formato tokenizado común (compartido con la 05); si no está disponible, se leen los TXT
 
 # --- COLAB (opcional; carpeta COREC subida a MyDrive) ---
 
@@ -47,6 +50,19 @@ if EN_COLAB:
 # --- Si quieres montar Drive, descomenta ---
 # if EN_COLAB:
 #     drive.mount("/content/drive")
+
+# --- Índice persistente de archivos (opcional; Scripts/00_COREC_comun/corec_indice.py) ---
+try:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "00_COREC_comun"))
+    import corec_indice
+except Exception:
+    corec_indice = None
+
+# --- Formato tokenizado común (opcional; Scripts/00_COREC_comun/corec_tokenizado.py, necesita NumPy) ---
+try:
+    import corec_tokenizado
+except Exception:
+    corec_tokenizado = None
 # ===========================================================
 
 
@@ -226,9 +242,25 @@ def segmentar_turno(texto_turno: str):
 # ===========================================================
 # PROCESADO
 # ===========================================================
-def procesar_txt(path_in: str, path_out: str):
+def turnos_txt(path_in: str):
+    """(etiqueta o None, resto de la línea) de cada línea no vacía del TXT."""
     with open(path_in, "r", encoding="utf-8", errors="ignore") as f:
-        lines = [ln.rstrip("\n") for ln in f]
+        for ln in f:
+            ln = ln.rstrip("\n")
+            if not ln.strip(): continue
+            m = TAG_TURN.match(ln)
+            if m:
+                yield m.group(1), m.group(2)
+            else:
+                yield None, ln
+
+
+def procesar_txt(path_in: str, path_out: str, tk=None):
+    if tk is not None:
+        # formato tokenizado común: mismas líneas y etiquetas, sin volver a leer el TXT
+        lineas = ((etiqueta, texto) for _, etiqueta, _, texto in tk.lineas(path_in))
+    else:
+        lineas = turnos_txt(path_in)
 
     salida = []
     preview = []
@@ -246,17 +278,15 @@ def procesar_txt(path_in: str, path_out: str):
                 preview.append(linea)
         buffer = []
 
-    for ln in lines:
-        if not ln.strip(): continue
-        m = TAG_TURN.match(ln)
-        if m:
+    for etiqueta, texto in lineas:
+        if etiqueta is not None:
             flush()
-            current_speaker = m.group(1)
-            content = m.group(2).strip()
+            current_speaker = etiqueta
+            content = texto.strip()
             buffer = [content] if content else []
         else:
             if current_speaker:
-                buffer.append(ln.strip())
+                buffer.append(texto.strip())
     flush()
 
     os.makedirs(os.path.dirname(path_out), exist_ok=True)
@@ -268,15 +298,30 @@ def procesar_txt(path_in: str, path_out: str):
 # ============
 # MAIN 
 # ============
+def listar_txt(root: str) -> list:
+    """TXT bajo root (recursivo): desde el índice persistente si está disponible, si no con os.walk."""
+    if USAR_INDICE and corec_indice is not None:
+        return corec_indice.listar_txt(root, ignorar_mayusculas=True)
+    return [
+        os.path.join(dp, name)
+        for dp, _, files in os.walk(root)
+        for name in files
+        if name.lower().endswith(".txt")
+    ]
+
 print("ROOT_IN existe?:", os.path.exists(ROOT_IN))
-all_txt = []
-for dp, _, files in os.walk(ROOT_IN):
-    for name in files:
-        if name.lower().endswith(".txt"):
-            all_txt.append(os.path.join(dp, name))
+all_txt = listar_txt(ROOT_IN)
 
 print("TXT encontrados:", len(all_txt))
 
+tk = None
+if USAR_TOKENIZADO and corec_tokenizado is not None:
+    try:
+        tk = corec_tokenizado.obtener(ROOT_IN, all_txt, TAG_TURN, etiqueta=1, texto=2)
+        print("Formato tokenizado:", tk.carpeta)
+    except Exception as e:
+        print(f"⚠ Formato tokenizado no disponible ({type(e).__name__}: {e}); se leen los TXT.")
+
 total = 0
 for src in all_txt:
     dp = os.path.dirname(src)
@@ -286,7 +331,7 @@ for src in all_txt:
 
     print("\n==============================")
     print("Archivo:", src)
-    preview = procesar_txt(src, dst)
+    preview = procesar_txt(src, dst, tk)
 
     print("\nVista previa:\n")
     for i, s in enumerate(preview[:PREVIEW_N], 1):
@@ -42,6 +42,7 @@ En Colab (opcional):
 """
 
 import re
+import sys
 import csv
 import unicodedata
 from pathlib import Path
@@ -63,6 +64,8 @@ except Exception:
 ROOT_IN = "Preprocesamiento_linguistico/1_Textos_segmentacion_discursiva"
 OUT_DIR = "Preprocesamiento_linguistico/2_Salida_TXT_normas/Salida_TXT_normas_1"
 OUT_CSV = "Preprocesamiento_linguistico/3_Logs/Log_normas_1/Log_normas_1.csv"
+USAR_INDICE = False  # True: listar los TXT desde el índice persistente (sin validar aún en Drive; si no está disponible, se recorre la carpeta)
+USAR_TOKENIZADO = True  # leer las UDs del formato tokenizado común; si no está disponible, se leen los TXT
 
 # --- COLAB (opcional; NO sobreescribir) ---
 if EN_COLAB:
@@ -75,6 +78,19 @@ if EN_COLAB:
 # if EN_COLAB:
 #     drive.mount("/content/drive")
 
+# --- Índice persistente de archivos (opcional; Scripts/00_COREC_comun/corec_indice.py) ---
+try:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "00_COREC_comun"))
+    import corec_indice
+except Exception:
+    corec_indice = None
+
+# --- Formato tokenizado común (opcional; Scripts/00_COREC_comun/corec_tokenizado.py, necesita NumPy) ---
+try:
+    import corec_tokenizado
+except Exception:
+    corec_tokenizado = None
+
 Path(OUT_DIR).mkdir(parents=True, exist_ok=True)
 Path(OUT_CSV).parent.mkdir(parents=True, exist_ok=True)
 
@@ -229,6 +245,8 @@ def iter_txt_files(root: str) -> List[Path]:
     rootp = Path(root)
     if rootp.is_file() and rootp.suffix.lower() == ".txt":
         return [rootp]
+    if USAR_INDICE and corec_indice is not None:
+        return sorted(Path(p) for p in corec_indice.listar_txt(root))
     return sorted([p for p in rootp.rglob("*.txt") if p.is_file()])
 
 print("Regex + LogRow OK")
@@ -731,10 +749,38 @@ def apply_normas_sin_2_9_11(
     return text
 
 
+def uds_txt(fp: Path):
+    """(label, resto) de cada línea etiquetada (UD) del TXT."""
+    with fp.open("r", encoding="utf-8", errors="replace") as f:
+        for raw_line in f:
+            line = raw_line.rstrip("\n")
+            m = LABEL_RE.match(line)
+            if m:
+                yield m.group("label"), m.group("rest")
+
+
+def abrir_tokenizado(files: List[Path]):
+    """Formato tokenizado común de las UDs de ROOT_IN (construido si hace falta), o None."""
+    if not USAR_TOKENIZADO or corec_tokenizado is None:
+        return None
+    raiz = ROOT_IN if Path(ROOT_IN).is_dir() else str(Path(ROOT_IN).parent)
+    try:
+        tk = corec_tokenizado.obtener(
+            raiz, [str(fp) for fp in files], LABEL_RE,
+            etiqueta="label", texto="rest", solo_etiquetadas=True, errores="replace",
+        )
+    except Exception as e:
+        print(f"⚠ Formato tokenizado no disponible ({type(e).__name__}: {e}); se leen los TXT.")
+        return None
+    print("Formato tokenizado:", tk.carpeta)
+    return tk
+
+
 def main():
     files = iter_txt_files(ROOT_IN)
     if not files:
         raise FileNotFoundError(f"No se encontraron .txt en: {ROOT_IN}")
+    tk = abrir_tokenizado(files)
 
     out_dir = Path(OUT_DIR)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -747,37 +793,36 @@ def main():
         linea_n = 0
         out_lines: List[str] = []
 
-        with fp.open("r", encoding="utf-8", errors="replace") as f:
-            for raw_line in f:
-                line = raw_line.rstrip("\n")
-                m = LABEL_RE.match(line)
-                if not m:
-                    continue
-
-                linea_n += 1
-                ud_counter += 1
-                id_ud = f"UD{ud_counter:05d}"
-
-                label = m.group("label")
-                hablante = label
-                rol = rol_from_label(label)
-
-                # IMPORTANTE: NO limpiar prefijos (. TL / . 1. / etc.)
-                contexto_raw = m.group("rest")
-
-                norm_rest = apply_normas_sin_2_9_11(
-                    contexto_raw=contexto_raw,
-                    id_archivo=id_archivo,
-                    id_ud=id_ud,
-                    linea_n=linea_n,
-                    hablante=hablante,
-                    rol=rol,
-                    rows=rows
-                )
-
-                if norm_rest is not None:
-                    # Reconstruimos la línea completa conservando la etiqueta
-                    out_lines.append(f"{label}: {norm_rest}")
+        if tk is not None:
+            # formato tokenizado común: mismas UDs, sin volver a leer ni separar el TXT
+            uds = ((label, rest) for _, label, _, rest in tk.lineas(str(fp)))
+        else:
+            uds = uds_txt(fp)
+
+        for label, rest in uds:
+            linea_n += 1
+            ud_counter += 1
+            id_ud = f"UD{ud_counter:05d}"
+
+            hablante = label
+            rol = rol_from_label(label)
+
+            # IMPORTANTE: NO limpiar prefijos (. TL / . 1. / etc.)
+            contexto_raw = rest
+
+            norm_rest = apply_normas_sin_2_9_11(
+                contexto_raw=contexto_raw,
+                id_archivo=id_archivo,
+                id_ud=id_ud,
+                linea_n=linea_n,
+                hablante=hablante,
+                rol=rol,
+                rows=rows
+            )
+
+            if norm_rest is not None:
+                # Reconstruimos la línea completa conservando la etiqueta
+                out_lines.append(f"{label}: {norm_rest}")
 
         # salida TXT
         out_name = f"{fp.stem}_normas_1{fp.suffix}"
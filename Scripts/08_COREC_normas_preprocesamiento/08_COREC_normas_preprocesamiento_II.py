@@ -42,6 +42,7 @@ En Colab (opcional):
 """
 
 import re
+import sys
 import csv
 from pathlib import Path
 from dataclasses import dataclass
@@ -62,6 +63,7 @@ except Exception:
 ROOT_IN = "Preprocesamiento_linguistico/2_Salida_TXT_normas/Salida_TXT_normas_1"
 OUT_DIR = "Preprocesamiento_linguistico/2_Salida_TXT_normas/Salida_TXT_normas_2"
 OUT_CSV = "Preprocesamiento_linguistico/3_Logs/Log_normas_2/Log_normas_2.csv"
+USAR_INDICE = False  # True: listar los TXT desde el índice persistente (sin validar aún en Drive; si no está disponible, se recorre la carpeta)
 
 # --- COLAB (opcional; NO sobreescribir) ---
 if EN_COLAB:
@@ -74,6 +76,13 @@ if EN_COLAB:
 # if EN_COLAB:
 #     drive.mount("/content/drive")
 
+# --- Índice persistente de archivos (opcional; Scripts/00_COREC_comun/corec_indice.py) ---
+try:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "00_COREC_comun"))
+    import corec_indice
+except Exception:
+    corec_indice = None
+
 Path(OUT_DIR).mkdir(parents=True, exist_ok=True)
 Path(OUT_CSV).parent.mkdir(parents=True, exist_ok=True)
 
@@ -863,6 +872,8 @@ def iter_txt_files(root: str) -> List[Path]:
     rootp = Path(root)
     if rootp.is_file() and rootp.suffix.lower() == ".txt":
         return [rootp]
+    if USAR_INDICE and corec_indice is not None:
+        return sorted(Path(p) for p in corec_indice.listar_txt(root))
     return sorted([p for p in rootp.rglob("*.txt") if p.is_file()])
 
 # ===========================================================